@@ -1,5 +1,6 @@
 from .database import Database
 from .connection_pool import ConnectionPool
-from .collections import CollectionBase, Collection, Relation
+from .collections import CollectionBase, Collection, Relation, warm_up_schemas
 from .graph import Graph, GraphConnection
 from .references import relationship, graph_relationship
+from .query import joinedload
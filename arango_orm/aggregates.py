@@ -0,0 +1,73 @@
+"""
+Aggregates Module
+-----------------
+
+Aggregate functions for Query.aggregate(), computed on the server using
+AQL's COLLECT ... AGGREGATE.
+
+Example::
+
+    from arango_orm.aggregates import count_, sum_
+
+    db.query(Order).group_by("customer").aggregate(total=sum_("amount"), n=count_())
+"""
+
+
+class Aggregate(object):
+    """
+    An AQL aggregate function applied to a field of the grouped records.
+
+    :param function: Name of the AQL aggregate function (e.g. "SUM").
+    :param field: Field name (dotted names select sub attributes of nested
+        fields), None for functions not using a field like count_().
+    """
+
+    def __init__(self, function, field=None):
+        self.function = function
+        self.field = field
+
+    def expression(self, query, var="rec"):
+        "Return the AQL expression of the aggregate for given query"
+
+        if self.field is None:
+            return "%s(1)" % self.function
+
+        return "%s(%s.%s)" % (self.function, var, query._attribute_path(self.field))
+
+    def __repr__(self):
+        return "<Aggregate({}({}))>".format(self.function, self.field or "")
+
+
+def count_():
+    "Number of records in the group"
+    return Aggregate("LENGTH")
+
+
+def count_distinct_(field):
+    "Number of distinct non null values of field"
+    return Aggregate("COUNT_DISTINCT", field)
+
+
+def sum_(field):
+    "Sum of field values, null values count as 0"
+    return Aggregate("SUM", field)
+
+
+def avg_(field):
+    "Average of non null field values"
+    return Aggregate("AVERAGE", field)
+
+
+def min_(field):
+    "Smallest non null field value"
+    return Aggregate("MIN", field)
+
+
+def max_(field):
+    "Largest field value"
+    return Aggregate("MAX", field)
+
+
+def unique_(field):
+    "List of distinct field values"
+    return Aggregate("UNIQUE", field)
@@ -0,0 +1,1112 @@
+"""
+Asyncio API
+-----------
+
+AsyncDatabase and AsyncQuery mirror Database and Query for asyncio
+applications. Requests go through a small non-blocking HTTP/1.1 client keeping
+a pool of keep-alive connections to each server, so one process can have many
+requests in flight.
+"""
+
+import asyncio
+import base64
+import copy
+import itertools
+import json
+import logging
+from collections import deque
+from urllib.parse import quote, urlencode, urlsplit
+
+from .database import _DocumentsLoader
+from .event import dispatch
+from .exceptions import DocumentNotFoundError, RequestError
+from .explain import QueryPlan, advise_indexes
+from .query import (
+    Page,
+    Query,
+    _CachedResult,
+    _chunks,
+    _KEY_BOUND_AQL,
+    _key_bound_vars,
+    _ranges_between,
+)
+
+log = logging.getLogger(__name__)
+
+# python-arango's names of cursor statistics
+_STATS_NAMES = {
+    "writesExecuted": "modified",
+    "writesIgnored": "ignored",
+    "documentLookups": "lookups",
+    "scannedFull": "scanned_full",
+    "scannedIndex": "scanned_index",
+    "executionTime": "execution_time",
+    "httpRequests": "http_requests",
+    "peakMemoryUsage": "peak_memory_usage",
+    "intermediateCommits": "intermediate_commits",
+}
+
+
+# python-arango's names of document write options and their HTTP parameters
+_WRITE_PARAMS = {
+    "sync": "waitForSync",
+    "silent": "silent",
+    "return_new": "returnNew",
+    "return_old": "returnOld",
+    "keep_none": "keepNull",
+    "merge": "mergeObjects",
+    "overwrite": "overwrite",
+    "overwrite_mode": "overwriteMode",
+    "refill_index_caches": "refillIndexCaches",
+}
+
+
+# requests sent again if a reused connection drops before the response
+_IDEMPOTENT_METHODS = ("GET", "HEAD")
+
+
+def _param_value(value):
+    "Return query string representation of a request parameter"
+
+    if isinstance(value, bool):
+        return "true" if value else "false"
+
+    return str(value)
+
+
+class AsyncHTTPClient(object):
+    """
+    Minimal HTTP/1.1 client on asyncio streams sending and receiving JSON.
+
+    Keeps up to max_connections connections to the server open and reuses
+    them for following requests.
+    """
+
+    def __init__(self, url, username=None, password=None, max_connections=100, timeout=None):
+        parts = urlsplit(url)
+        self.host = parts.hostname
+        self.ssl = parts.scheme == "https"
+        self.port = parts.port or (443 if self.ssl else 80)
+        self.max_connections = max_connections
+        self.timeout = timeout
+
+        self._headers = "Host: %s:%d\r\nAccept: application/json\r\n" % (
+            self.host, self.port
+        )
+        if username is not None:
+            credentials = "%s:%s" % (username, password or "")
+            self._headers += "Authorization: Basic %s\r\n" % base64.b64encode(
+                credentials.encode("utf-8")
+            ).decode("ascii")
+
+        # idle keep-alive connections, (reader, writer) tuples
+        self._idle = []
+        # limits concurrent requests, created in the event loop on first use
+        self._slots = None
+
+    async def request(self, method, path, params=None, data=None):
+        """
+        Send a request, return the response status and decoded JSON body (None
+        for empty responses). Raises RequestError if the body isn't JSON.
+        """
+
+        if params:
+            path += "?" + urlencode(
+                {k: _param_value(v) for k, v in params.items() if v is not None}
+            )
+
+        body = b"" if data is None else json.dumps(data).encode("utf-8")
+        message = (
+            "%s %s HTTP/1.1\r\n%sContent-Type: application/json\r\n"
+            "Content-Length: %d\r\n\r\n" % (method, path, self._headers, len(body))
+        ).encode("latin-1") + body
+
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.max_connections)
+
+        async with self._slots:
+            send = self._send(method, message)
+            if self.timeout is not None:
+                send = asyncio.wait_for(send, self.timeout)
+
+            status, payload = await send
+
+        if not payload:
+            return status, None
+
+        try:
+            return status, json.loads(payload)
+        except ValueError:
+            # e.g. the error page of a proxy
+            raise RequestError(
+                "HTTP %d, invalid JSON response: %r" % (status, payload[:100]),
+                http_code=status,
+            )
+
+    async def _send(self, method, message):
+        while True:
+            reused = bool(self._idle)
+            if reused:
+                reader, writer = self._idle.pop()
+                if reader.at_eof() or writer.is_closing():
+                    # the server closed the idle connection, nothing was sent
+                    writer.close()
+                    continue
+            else:
+                reader, writer = await asyncio.open_connection(
+                    self.host, self.port, ssl=self.ssl or None
+                )
+
+            error = None
+            try:
+                writer.write(message)
+                await writer.drain()
+                response = await self._read_response(reader, method)
+            except (ConnectionError, asyncio.IncompleteReadError) as exc:
+                error = exc
+                response = None
+            except BaseException:
+                writer.close()
+                raise
+
+            if response is None:
+                writer.close()
+                # the request may have been processed before the connection
+                # dropped, only requests without side effects are sent again
+                if reused and method in _IDEMPOTENT_METHODS:
+                    continue
+                raise ConnectionError("Connection closed by the server") from error
+
+            status, keep_alive, payload = response
+            if keep_alive:
+                self._idle.append((reader, writer))
+            else:
+                writer.close()
+
+            return status, payload
+
+    @staticmethod
+    async def _read_response(reader, method):
+        "Return status, keep alive flag and body of a response or None on EOF"
+
+        line = await reader.readline()
+        if not line:
+            return None
+
+        status = int(line.split()[1])
+        headers = {}
+        while True:
+            line = await reader.readline()
+            if line in (b"\r\n", b"\n", b""):
+                break
+
+            name, _, value = line.decode("latin-1").partition(":")
+            headers[name.strip().lower()] = value.strip()
+
+        keep_alive = headers.get("connection", "").lower() != "close"
+
+        if method == "HEAD" or status in (204, 304):
+            payload = b""
+
+        elif headers.get("transfer-encoding", "").lower() == "chunked":
+            chunks = []
+            while True:
+                size = int((await reader.readline()).split(b";")[0], 16)
+                if size == 0:
+                    # skip trailers
+                    while (await reader.readline()) not in (b"\r\n", b"\n", b""):
+                        pass
+                    break
+
+                chunks.append(await reader.readexactly(size))
+                await reader.readexactly(2)
+
+            payload = b"".join(chunks)
+
+        elif "content-length" in headers:
+            payload = await reader.readexactly(int(headers["content-length"]))
+
+        else:
+            payload = await reader.read()
+            keep_alive = False
+
+        return status, keep_alive, payload
+
+    async def close(self):
+        "Close all idle connections."
+
+        idle, self._idle = self._idle, []
+        for _, writer in idle:
+            writer.close()
+
+
+class AsyncCursor(object):
+    """
+    Cursor over the results of an AQL query, use with async for.
+    """
+
+    def __init__(self, db, data):
+        self._db = db
+        self._id = data.get("id")
+        self._count = data.get("count")
+        self._batch = deque()
+        self._has_more = False
+        self._stats = {}
+        self._plan = None
+        self._profile = None
+        self._update(data)
+
+    def _update(self, data):
+        self._batch.extend(data["result"])
+        self._has_more = bool(data.get("hasMore"))
+
+        extra = data.get("extra", {})
+        if "stats" in extra:
+            self._stats = {_STATS_NAMES.get(k, k): v for k, v in extra["stats"].items()}
+        self._plan = extra.get("plan", self._plan)
+        self._profile = extra.get("profile", self._profile)
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        if not self._batch and self._has_more:
+            await self.fetch()
+
+        if not self._batch:
+            raise StopAsyncIteration
+
+        return self._batch.popleft()
+
+    def batch(self):
+        return self._batch
+
+    def has_more(self):
+        return self._has_more
+
+    def count(self):
+        return self._count
+
+    def statistics(self):
+        return self._stats
+
+    def plan(self):
+        return self._plan
+
+    def profile(self):
+        return self._profile
+
+    async def fetch(self):
+        "Fetch the next batch of results from the server."
+
+        self._update(await self._db._request("PUT", "/_api/cursor/" + self._id))
+
+    async def close(self):
+        "Delete the cursor on the server if it has more results."
+
+        if self._id is not None and self._has_more:
+            self._has_more = False
+            await self._db._request("DELETE", "/_api/cursor/" + self._id)
+
+
+class AsyncAQL(object):
+    "Executes AQL queries, see AsyncDatabase.aql"
+
+    def __init__(self, db):
+        self._db = db
+
+    async def execute(
+        self,
+        query,
+        bind_vars=None,
+        count=False,
+        batch_size=None,
+        ttl=None,
+        full_count=None,
+        stream=None,
+        memory_limit=None,
+        profile=None,
+    ):
+        "Execute an AQL query and return an AsyncCursor over its results."
+
+        data = {"query": query, "count": count}
+        if bind_vars:
+            data["bindVars"] = bind_vars
+        if batch_size is not None:
+            data["batchSize"] = batch_size
+        if ttl is not None:
+            data["ttl"] = ttl
+        if memory_limit:
+            data["memoryLimit"] = memory_limit
+
+        options = {}
+        if full_count is not None:
+            options["fullCount"] = full_count
+        if stream is not None:
+            options["stream"] = stream
+        if profile is not None:
+            options["profile"] = profile
+        if options:
+            data["options"] = options
+
+        return AsyncCursor(
+            self._db, await self._db._request("POST", "/_api/cursor", data=data)
+        )
+
+    async def explain(self, query, bind_vars=None):
+        "Return the execution plan of an AQL query."
+
+        data = {"query": query}
+        if bind_vars:
+            data["bindVars"] = bind_vars
+
+        result = await self._db._request("POST", "/_api/explain", data=data)
+        plan = result["plan"]
+        if "stats" in result:
+            plan["stats"] = result["stats"]
+
+        return plan
+
+
+class AsyncCollection(object):
+    "Document operations of a collection, see AsyncDatabase.collection"
+
+    def __init__(self, db, name):
+        self._db = db
+        self.name = name
+        self._path = "/_api/document/" + quote(name, safe="")
+
+    def _doc_path(self, key):
+        return self._path + "/" + quote(str(key), safe="")
+
+    async def get(self, key):
+        "Return the document with given key or None."
+        try:
+            return await self._db._request("GET", self._doc_path(key))
+        except RequestError as exp:
+            if exp.http_code == 404:
+                return None
+            raise
+
+    async def has(self, key):
+        try:
+            await self._db._request("HEAD", self._doc_path(key))
+        except RequestError as exp:
+            if exp.http_code == 404:
+                return False
+            raise
+
+        return True
+
+    async def count(self):
+        result = await self._db._request(
+            "GET", "/_api/collection/%s/count" % quote(self.name, safe="")
+        )
+        return result["count"]
+
+    async def shards(self):
+        "Return the shards of the collection (cluster only)."
+        return await self._db._request(
+            "GET", "/_api/collection/%s/shards" % quote(self.name, safe="")
+        )
+
+    @staticmethod
+    def _params(options):
+        """
+        Return the HTTP parameters of write options named like python-arango's
+        (sync, keep_none, return_new etc.).
+        """
+        params = {}
+        for name, value in options.items():
+            if name not in _WRITE_PARAMS:
+                raise TypeError("Unsupported document write option %r" % name)
+
+            params[_WRITE_PARAMS[name]] = value
+
+        return params
+
+    async def insert(self, document, **options):
+        return await self._db._request(
+            "POST", self._path, self._params(options), document
+        )
+
+    async def update(self, document, **options):
+        return await self._db._request(
+            "PATCH", self._doc_path(document["_key"]), self._params(options), document
+        )
+
+    async def delete(self, key, **options):
+        return await self._db._request(
+            "DELETE", self._doc_path(key), self._params(options)
+        )
+
+    async def insert_many(self, documents, **options):
+        "Insert documents, failed ones are returned as RequestError objects."
+        return self._results(
+            await self._db._request("POST", self._path, self._params(options), documents)
+        )
+
+    async def update_many(self, documents, **options):
+        "Update documents, failed ones are returned as RequestError objects."
+        return self._results(
+            await self._db._request("PATCH", self._path, self._params(options), documents)
+        )
+
+    @staticmethod
+    def _results(results):
+        return [
+            RequestError(res.get("errorMessage"), error_code=res.get("errorNum"))
+            if res.get("error")
+            else res
+            for res in results
+        ]
+
+
+class _AsyncCachedResult(_CachedResult):
+    "Rows of a cached query result, standing in for its AsyncCursor"
+
+    async def _records(self):
+        for rec in list.__iter__(self):
+            yield rec
+
+    def __aiter__(self):
+        return self._records()
+
+    async def close(self):
+        pass
+
+
+async def _prefetch_batches(cursor):
+    """
+    Yield the records of an AsyncCursor, fetching the next batch while the
+    current one is consumed.
+    """
+
+    fetch = None
+    try:
+        while True:
+            batch = cursor.batch()
+            records = list(batch)
+            batch.clear()
+
+            fetch = asyncio.ensure_future(cursor.fetch()) if cursor.has_more() else None
+            for rec in records:
+                yield rec
+
+            if fetch is None:
+                return
+
+            await fetch
+
+    finally:
+        if fetch is not None and not fetch.done():
+            fetch.cancel()
+
+
+async def _scan_partitions(queries, return_clause, workers, **cursor_options):
+    """
+    Yield the batches of records of several AsyncQuery objects, running at
+    most workers of them concurrently, in the order the batches arrive.
+    """
+
+    batches = asyncio.Queue(maxsize=2 * workers)
+    slots = asyncio.Semaphore(workers)
+
+    async def scan(query):
+        try:
+            async with slots:
+                cursor = await query._execute(return_clause, **cursor_options)
+                while True:
+                    batch = cursor.batch()
+                    records = list(batch)
+                    batch.clear()
+
+                    if records:
+                        await batches.put(records)
+
+                    if not cursor.has_more():
+                        break
+
+                    await cursor.fetch()
+
+        except Exception as exc:  # pylint: disable=broad-except
+            await batches.put(exc)
+            return
+
+        await batches.put(None)
+
+    tasks = [asyncio.ensure_future(scan(query)) for query in queries]
+    remaining = len(tasks)
+    try:
+        while remaining:
+            records = await batches.get()
+            if records is None:
+                remaining -= 1
+                continue
+
+            if isinstance(records, Exception):
+                raise records
+
+            yield records
+    finally:
+        for task in tasks:
+            task.cancel()
+
+
+class AsyncQuery(Query):
+    """
+    Query of an AsyncDatabase. Filtering, sorting etc. work like Query, methods
+    running the query are coroutines (or async iterators).
+    """
+
+    def __aiter__(self):
+        return self.iterator()
+
+    async def _execute(self, return_clause, joins=True, **cursor_options):
+        aql, bind_vars = self._select_aql(return_clause, joins)
+        options = {k: v for k, v in cursor_options.items() if v is not None}
+
+        return await self._run(aql, bind_vars, ttl=self._cursor_ttl, **options)
+
+    async def _run(self, aql, bind_vars=None, **options):
+        "Execute aql, using the database's result cache for cached() queries."
+
+        if bind_vars is None:
+            bind_vars = self._bind_vars
+
+        cache = self._result_cache(options)
+        if cache is None:
+            return await self._db.aql.execute(aql, bind_vars=bind_vars, **options)
+
+        key = self._result_key(aql, bind_vars, options)
+        entry = cache.get(key)
+        if entry is None:
+            collections = self._result_collections(bind_vars)
+            generation = cache.generation(collections)
+            cursor = await self._db.aql.execute(aql, bind_vars=bind_vars, **options)
+            entry = ([rec async for rec in cursor], cursor.statistics())
+            cache.put(
+                key, entry, collections, ttl=self._cache_ttl, generation=generation
+            )
+
+        rows, stats = entry
+        return _AsyncCachedResult(copy.deepcopy(rows), stats)
+
+    async def _rows(self, return_clause, joins=True):
+        return [rec async for rec in await self._execute(return_clause, joins)]
+
+    async def count(self):
+        "Return the number of records matching the query, see Query.count()."
+
+        if self._counts_collection():
+            return await self._db.collection(
+                self._CollectionClass.__collection__
+            ).count()
+
+        aql = self._make_aql(
+            "\n COLLECT WITH COUNT INTO rec_count RETURN rec_count"
+        )
+        cursor = await self._run(aql)
+
+        return await cursor.__aiter__().__anext__()
+
+    async def full_count(self):
+        "Return the number of records matching the query ignoring its limit"
+
+        return await self._without_limit().count()
+
+    async def by_key(self, key):
+        "Return a single document using it's key"
+
+        doc_dict = await self._db.collection(
+            self._CollectionClass.__collection__
+        ).get(key)
+        if doc_dict is None:
+            raise DocumentNotFoundError(
+                "(%s %r) not found"
+                % (self._CollectionClass.__collection__, key)
+            )
+
+        return self._CollectionClass._load(doc_dict, db=self._db, from_db=True)
+
+    async def by_keys(self, keys, preserve_order=True, missing="skip", only=None, chunk_size=1000):
+        "Return the documents with given keys, see Query.by_keys()."
+
+        keys = list(keys)
+        query, aql = self._by_keys_query(preserve_order, missing, only)
+
+        rows = []
+        for chunk in _chunks(keys, chunk_size):
+            cursor = await self._db.aql.execute(aql, bind_vars=self._by_keys_vars(chunk))
+            rows.extend([rec async for rec in cursor])
+
+        return query._by_keys_records(keys, rows, missing)
+
+    async def iterator(
+        self, lazy=False, batch_size=None, stream=None, memory_limit=None, prefetch=False
+    ):
+        """
+        Iterate over all records considering current filter conditions (if
+        any). See Query.iterator(), with prefetch the next batch is fetched by
+        a task instead of a thread.
+        """
+
+        cursor = await self._execute(
+            self._load_clause(),
+            batch_size=batch_size,
+            stream=stream,
+            memory_limit=memory_limit,
+        )
+
+        if prefetch and not isinstance(cursor, _AsyncCachedResult):
+            cursor = _prefetch_batches(cursor)
+
+        async for rec in cursor:
+            yield self._load_record(rec, lazy=lazy)
+
+    async def parallel_iter(
+        self, partitions=None, workers=None, dbs=None, lazy=False, batch_size=None, transform=None
+    ):
+        """
+        Iterate over all records matching the query, scanning partitions of
+        the collection's key space concurrently. See Query.parallel_iter(),
+        workers limits the number of partitions scanned at the same time and
+        transform runs in the event loop (no process pools).
+        """
+
+        if self._sort_columns or self._limit:
+            raise ValueError("parallel_iter() can't be used with sort() or limit()")
+
+        if partitions is None:
+            partitions = await self._shard_count() or 4
+
+        queries = self._partition_queries(
+            await self._key_ranges(partitions), dbs or [self._db]
+        )
+        batches = _scan_partitions(
+            queries,
+            self._return_clause() if transform else self._load_clause(),
+            workers or len(queries),
+            batch_size=batch_size,
+            joins=transform is None,
+        )
+
+        async for records in batches:
+            for rec in records:
+                if transform is not None:
+                    yield transform(rec)
+                else:
+                    yield self._load_record(rec, lazy=lazy)
+
+    async def _shard_count(self):
+        "Return the number of shards of the collection, None if not in a cluster"
+
+        collection = self._db.collection(self._CollectionClass.__collection__)
+        try:
+            return len((await collection.shards()).get("shards") or {}) or None
+        except RequestError:
+            return None
+
+    async def _key_ranges(self, partitions):
+        "Return (low, high) _key bounds splitting the collection, see Query._key_ranges()."
+
+        collection = self._CollectionClass.__collection__
+        total = await self._db.collection(collection).count()
+
+        bounds = []
+        for bind_vars in _key_bound_vars(collection, total, partitions):
+            cursor = await self._db.aql.execute(_KEY_BOUND_AQL, bind_vars=bind_vars)
+            bounds.extend([key async for key in cursor])
+
+        return _ranges_between(bounds)
+
+    async def explain(self):
+        "Return the QueryPlan of the query, see Query.explain()."
+
+        aql, bind_vars = self._select_aql(self._load_clause())
+        plan = await self._db.aql.explain(aql, bind_vars=bind_vars)
+
+        return QueryPlan(plan, plan.get("stats"))
+
+    async def profile(self):
+        "Execute the query with profiling, see Query.profile()."
+
+        cursor = await self._execute(self._load_clause(), profile=2)
+        await cursor.close()
+
+        return QueryPlan(cursor.plan(), cursor.statistics(), cursor.profile())
+
+    async def advise_indexes(self, explain=False):
+        "Return a list of IndexAdvice for the query, see Query.advise_indexes()."
+
+        return advise_indexes(self, await self.explain() if explain else None)
+
+    async def all(self):
+        return [rec async for rec in self.iterator()]
+
+    async def dicts(self):
+        "Iterate over all records as raw document dicts, see Query.dicts()."
+
+        async for rec in await self._execute(self._return_clause(), joins=False):
+            yield rec
+
+    async def tuples(self, *fields):
+        "Iterate over all records as tuples of field values, see Query.tuples()."
+
+        fields = self._tuple_fields(fields)
+        async for rec in await self._execute(self._array_clause(fields), joins=False):
+            yield tuple(rec)
+
+    async def aggregate(self, **aggregates):
+        "Return a list of dicts of groups and their aggregates, see Query.aggregate()."
+
+        cursor = await self._run(self._aggregate_aql(aggregates))
+
+        return [row async for row in cursor]
+
+    async def to_columns(self, *fields):
+        "Return the values of given fields as a dict of columns, see Query.to_columns()."
+
+        fields = self._column_fields(fields)
+
+        return self._fill_columns(
+            fields, await self._rows(self._array_clause(fields), joins=False)
+        )
+
+    async def to_arrays(self, *fields):
+        "Return the values of given fields as numpy arrays, see Query.to_arrays()."
+
+        return self._columns_to_arrays(await self.to_columns(*fields))
+
+    async def paginate(self, page_size, by=None, token=None):
+        "Return a Page of records using keyset pagination, see Query.paginate()."
+
+        query, clause, by = self._page_query(page_size, by, token)
+
+        return self._make_page(await query._rows(clause), page_size, by)
+
+    async def page(self, page_num, page_size):
+        "Return a Page of records and the total record count, see Query.page()."
+
+        query = self._page_num_query(page_num, page_size)
+        cursor = await query._execute(query._load_clause(), full_count=True)
+        records = [query._load_record(rec) async for rec in cursor]
+
+        return Page(
+            records,
+            total=cursor.statistics()["fullCount"],
+            offset=query._limit_start_record,
+        )
+
+    async def first(self):
+        "Return the first record that matches the query or None"
+
+        query = self._limited(1)
+        async for rec in await query._execute(query._load_clause()):
+            return self._load_record(rec)
+
+        return None
+
+    async def one(self):
+        "Return the only record matching the query, see Query.one()."
+
+        query = self._limited(2)
+        return self._load_one(await query._rows(query._load_clause()))
+
+    async def one_or_none(self):
+        "Return the only record matching the query or None, see Query.one_or_none()."
+
+        query = self._limited(2)
+        return self._load_one(
+            await query._rows(query._load_clause()), required=False
+        )
+
+    async def update(self, wait_for_sync=True, ignore_errors=False, returning=None, **kwargs):
+        "Update the matching records, see Query.update()."
+
+        aql = self._update_aql(wait_for_sync, ignore_errors, returning, **kwargs)
+        cursor = await self._db.aql.execute(aql, bind_vars=self._bind_vars)
+        self._db._invalidate_results(self._CollectionClass.__collection__)
+
+        return await self._write_result(cursor, returning)
+
+    async def delete(self, wait_for_sync=True, ignore_errors=False, returning=None):
+        "Remove the matching records, see Query.delete()."
+
+        aql = self._delete_aql(wait_for_sync, ignore_errors, returning)
+        cursor = await self._db.aql.execute(aql, bind_vars=self._bind_vars)
+        self._db._invalidate_results(self._CollectionClass.__collection__)
+
+        return await self._write_result(cursor, returning)
+
+    async def _write_result(self, cursor, returning):
+        if returning is None:
+            return cursor
+
+        if returning == "count":
+            return cursor.statistics()["modified"]
+
+        return [self._load_record(rec) async for rec in cursor]
+
+    async def aql(self, query, **kwargs):
+        """
+        Run AQL query to get results, see Query.aql().
+        """
+        bind_vars = dict(kwargs.pop("bind_vars", None) or {})
+        bind_vars["@collection"] = self._bind_vars["@collection"]
+
+        cursor = await self._db.aql.execute(query, bind_vars=bind_vars, **kwargs)
+
+        return [
+            self._CollectionClass._load(rec, db=self._db, from_db=True)
+            async for rec in cursor
+        ]
+
+
+class AsyncDatabase(object):
+    """
+    asyncio counterpart of Database.
+
+    :param hosts: Server URL or list of URLs used in round robin fashion.
+    :param name: Database name.
+    :param max_connections: Maximum number of concurrent connections (and
+        requests) per host.
+    :param timeout: Request timeout in seconds.
+    :param result_cache: ResultCache for the results of cached() queries, see
+        Database.
+    """
+
+    def __init__(
+        self,
+        hosts="http://127.0.0.1:8529",
+        name="_system",
+        username="root",
+        password="",
+        max_connections=100,
+        timeout=None,
+        result_cache=None,
+    ):
+        if isinstance(hosts, str):
+            hosts = [hosts]
+
+        self.name = name
+        self._clients = [
+            AsyncHTTPClient(host, username, password, max_connections, timeout)
+            for host in hosts
+        ]
+        self._next_client = itertools.cycle(self._clients)
+        self._prefix = "/_db/" + quote(name, safe="")
+        self.aql = AsyncAQL(self)
+        self.result_cache = result_cache
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+    async def close(self):
+        "Close the connections to the server(s)."
+        for client in self._clients:
+            await client.close()
+
+    def _invalidate_results(self, collection_name):
+        "Remove cached query results of the collection after writing to it"
+
+        if self.result_cache is not None:
+            self.result_cache.invalidate(collection_name)
+
+    async def _request(self, method, path, params=None, data=None):
+        "Send a request to the database, raise RequestError for errors."
+
+        status, result = await next(self._next_client).request(
+            method, self._prefix + path, params, data
+        )
+
+        if status >= 400:
+            result = result or {}
+            raise RequestError(
+                result.get("errorMessage", "HTTP %d" % status),
+                http_code=status,
+                error_code=result.get("errorNum"),
+            )
+
+        return result
+
+    def collection(self, name):
+        return AsyncCollection(self, name)
+
+    def query(self, CollectionClass):
+        "Query given collection"
+
+        return AsyncQuery(CollectionClass, self)
+
+    async def get_many(self, ids, only=None, missing="skip", models=None, chunk_size=1000):
+        "Return the documents with given _ids, see Database.get_many()."
+
+        loader = _DocumentsLoader(ids, only=only, missing=missing, models=models)
+
+        rows = []
+        for chunk in _chunks(loader.ids, chunk_size):
+            cursor = await self.aql.execute(loader.aql, bind_vars=loader.bind_vars(chunk))
+            rows.extend([rec async for rec in cursor])
+
+        return loader.load(rows, self)
+
+    async def has(self, collection, key):
+        """Check if the document with key exists in the given collection."""
+
+        return await self.collection(collection.__collection__).has(key)
+
+    async def exists(self, document):
+        """Check if document exists in database, see Database.exists."""
+
+        return await self.collection(document.__collection__).has(document._key)
+
+    async def add(self, entity, if_present=None):
+        """
+        Add a record to a collection, see Database.add.
+        """
+        assert if_present in [None, "ignore", "update"]
+        if if_present and getattr(entity, "_key", None):
+            # for these cases, first check if document exists
+            if await self.exists(entity):
+                if if_present == "ignore":
+                    setattr(entity, "_db", self)
+                    return entity
+
+                elif if_present == "update":
+                    return await self.update(entity)
+
+        dispatch(entity, "pre_add", db=self)
+
+        setattr(entity, "_db", self)
+        data = entity._dump()
+        res = await self.collection(entity.__collection__).insert(data)
+        self._invalidate_results(entity.__collection__)
+        if not getattr(entity, "_key", None) and "_key" in res:
+            setattr(entity, "_key", res["_key"])
+        entity._mark_saved(data)
+
+        dispatch(entity, "post_add", db=self, result=res)
+        return res
+
+    async def bulk_add(self, entity_list, only_dirty=False, **params):
+        """
+        Add all provided documents, one request per collection. See
+        Database.bulk_add.
+        """
+        collections = {}
+        for entity in entity_list:
+            if only_dirty:
+                if not entity._update_dirty():
+                    continue
+                dispatch(entity, "pre_update", db=self)
+                data = entity._dump(only=entity._dirty)
+            else:
+                dispatch(entity, "pre_add", db=self)
+                data = entity._dump()
+
+            collection_dict = collections.setdefault(
+                entity.__collection__,
+                dict(entity_dict_list=[], entity_obj_list=[]),
+            )
+            collection_dict["entity_dict_list"].append(data)
+            collection_dict["entity_obj_list"].append(entity)
+            setattr(entity, "_db", self)
+
+        for collection, data in collections.items():
+            entity_dict_list = data["entity_dict_list"]
+            res = await self.collection(collection).insert_many(
+                entity_dict_list, **params
+            )
+            self._invalidate_results(collection)
+            for num, entity in enumerate(data["entity_obj_list"]):
+                if isinstance(res[num], RequestError):
+                    continue
+
+                if not getattr(entity, "_key", None) and "_key" in res[num]:
+                    setattr(entity, "_key", res[num]["_key"])
+                entity._mark_saved(entity_dict_list[num], partial=only_dirty)
+                dispatch(entity, "post_add", db=self, result=res[num])
+
+        return collections
+
+    async def delete(self, entity, **params):
+        """Delete given document."""
+        dispatch(entity, "pre_delete", db=self)
+
+        res = await self.collection(entity.__collection__).delete(
+            entity._key, **params
+        )
+        self._invalidate_results(entity.__collection__)
+
+        dispatch(entity, "post_delete", db=self, result=res)
+        return res
+
+    async def bulk_delete(self, entity_list, **params):
+        """Delete given documents concurrently, return a list of results."""
+        return list(
+            await asyncio.gather(
+                *[self.delete(entity, **params) for entity in entity_list]
+            )
+        )
+
+    async def update(self, entity, only_dirty=False, **params):
+        "Update given document, see Database.update"
+
+        if only_dirty:
+            if not entity._update_dirty():
+                return entity
+            dispatch(entity, "pre_update", db=self)
+            data = entity._dump(only=entity._dirty)
+        else:
+            dispatch(entity, "pre_update", db=self)
+            data = entity._dump()
+
+        setattr(entity, "_db", self)
+        res = await self.collection(entity.__collection__).update(data, **params)
+        self._invalidate_results(entity.__collection__)
+        entity._mark_saved(data, partial=only_dirty)
+
+        dispatch(entity, "post_update", db=self, result=res)
+        return res
+
+    async def bulk_update(self, entity_list, only_dirty=False, **params):
+        """
+        Update all provided documents, one request per collection. See
+        Database.bulk_update.
+        """
+        collections = {}
+        for entity in entity_list:
+            if only_dirty:
+                if not entity._update_dirty():
+                    continue
+                dispatch(entity, "pre_update", db=self)
+                data = entity._dump(only=entity._dirty)
+            else:
+                dispatch(entity, "pre_update", db=self)
+                data = entity._dump()
+
+            collection_dict = collections.setdefault(
+                entity.__collection__,
+                dict(entity_dict_list=[], entity_obj_list=[]),
+            )
+            collection_dict["entity_dict_list"].append(data)
+            collection_dict["entity_obj_list"].append(entity)
+            setattr(entity, "_db", self)
+
+        for collection, data in collections.items():
+            entity_dict_list = data["entity_dict_list"]
+            res = await self.collection(collection).update_many(
+                entity_dict_list, **params
+            )
+            self._invalidate_results(collection)
+            for num, entity in enumerate(data["entity_obj_list"]):
+                if isinstance(res[num], RequestError):
+                    continue
+
+                entity._mark_saved(entity_dict_list[num], partial=only_dirty)
+                dispatch(entity, "post_update", db=self, result=res[num])
+
+        return collections
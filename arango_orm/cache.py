@@ -0,0 +1,204 @@
+"""
+Cache Module
+------------
+
+Small caches used internally by arango_orm.
+"""
+
+import threading
+import time
+from collections import OrderedDict, namedtuple
+
+CacheInfo = namedtuple(
+    "CacheInfo", ["hits", "misses", "evictions", "maxsize", "currsize"]
+)
+
+ResultCacheInfo = namedtuple(
+    "ResultCacheInfo", CacheInfo._fields + ("expirations", "invalidations")
+)
+
+
+class LRUCache(object):
+    """
+    Thread safe mapping keeping at most maxsize entries.
+
+    When full, adding an entry evicts the least recently used one. A maxsize
+    of None means the cache is unbounded.
+    """
+
+    def __init__(self, maxsize=128):
+        self.maxsize = maxsize
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key, default=None):
+        "Return the value for key (marking it as recently used) or default."
+        with self._lock:
+            try:
+                value = self._data[key]
+            except KeyError:
+                self.misses += 1
+                return default
+
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def __setitem__(self, key, value):
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+
+            if self.maxsize is not None:
+                while len(self._data) > self.maxsize:
+                    self._data.popitem(last=False)
+                    self.evictions += 1
+
+    def pop(self, key, default=None):
+        with self._lock:
+            return self._data.pop(key, default)
+
+    def __contains__(self, key):
+        return key in self._data
+
+    def __len__(self):
+        return len(self._data)
+
+    def keys(self):
+        with self._lock:
+            return list(self._data)
+
+    def clear(self):
+        "Remove all entries and reset the statistics."
+        with self._lock:
+            self._data.clear()
+            self.hits = self.misses = self.evictions = 0
+
+    def info(self):
+        "Return cache statistics as a CacheInfo tuple."
+        return CacheInfo(
+            self.hits, self.misses, self.evictions, self.maxsize, len(self._data)
+        )
+
+
+class ResultCache(LRUCache):
+    """
+    Thread safe LRU cache of query results, see Query.cached().
+
+    Entries expire ttl seconds after being stored (never if ttl is None) and
+    are removed when one of the collections they were read from is written to
+    (see invalidate()).
+    """
+
+    def __init__(self, maxsize=1024, ttl=60):
+        super(ResultCache, self).__init__(maxsize)
+        self.ttl = ttl
+        self.expirations = 0
+        self.invalidations = 0
+        self._keys_by_collection = {}
+        self._generations = {}
+
+    def get(self, key, default=None):
+        "Return the unexpired value for key (marking it as recently used) or default."
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None and entry[1] is not None and entry[1] <= time.monotonic():
+                self._remove(key)
+                self.expirations += 1
+                entry = None
+
+            if entry is None:
+                self.misses += 1
+                return default
+
+            self._data.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def generation(self, collections):
+        """
+        Return a token to pass to put() for results read from collections now,
+        so that results read before an invalidation are not stored after it.
+        """
+        with self._lock:
+            return tuple(self._generations.get(c, 0) for c in collections)
+
+    def put(self, key, value, collections, ttl=None, generation=None):
+        """
+        Store value for key, read from the given collection names. ttl
+        overrides the cache's ttl.
+        """
+        collections = tuple(collections)
+        ttl = self.ttl if ttl is None else ttl
+        expires = None if ttl is None else time.monotonic() + ttl
+
+        with self._lock:
+            if generation is not None and generation != tuple(
+                self._generations.get(c, 0) for c in collections
+            ):
+                return
+
+            if key in self._data:
+                self._remove(key)
+
+            self._data[key] = (value, expires, collections)
+            for c in collections:
+                self._keys_by_collection.setdefault(c, set()).add(key)
+
+            if self.maxsize is not None:
+                while len(self._data) > self.maxsize:
+                    self._remove(next(iter(self._data)))
+                    self.evictions += 1
+
+    def __setitem__(self, key, value):
+        self.put(key, value, ())
+
+    def pop(self, key, default=None):
+        with self._lock:
+            if key not in self._data:
+                return default
+
+            return self._remove(key)[0]
+
+    def invalidate(self, collection):
+        "Remove the entries read from the collection with given name"
+        with self._lock:
+            self._generations[collection] = self._generations.get(collection, 0) + 1
+            for key in self._keys_by_collection.pop(collection, ()):
+                if key in self._data:
+                    self._remove(key)
+                    self.invalidations += 1
+
+    def _remove(self, key):
+        entry = self._data.pop(key)
+        for c in entry[2]:
+            keys = self._keys_by_collection.get(c)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._keys_by_collection[c]
+
+        return entry
+
+    def clear(self):
+        "Remove all entries and reset the statistics."
+        with self._lock:
+            self._data.clear()
+            self._keys_by_collection.clear()
+            self.hits = self.misses = self.evictions = 0
+            self.expirations = self.invalidations = 0
+
+    def info(self):
+        "Return cache statistics as a ResultCacheInfo tuple."
+        return ResultCacheInfo(
+            self.hits,
+            self.misses,
+            self.evictions,
+            self.maxsize,
+            len(self._data),
+            self.expirations,
+            self.invalidations,
+        )
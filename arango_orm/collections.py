@@ -5,8 +5,12 @@ Collections Module
 Core classes for working with collections (vertices) and relations (edges).
 """
 
+import copyreg
+import inspect
 import logging
+import types
 import typing
+import weakref
 from marshmallow.fields import String
 from six import with_metaclass
 from marshmallow import (
@@ -18,6 +22,8 @@ from marshmallow import (
     INCLUDE,
     post_load)
 
+from .cache import LRUCache, CacheInfo
+from .expressions import Column
 from .references import (
     Relationship,
     GraphRelationship,
@@ -30,6 +36,9 @@ from .exceptions import (  # pylint: disable=E0402
 
 log = logging.getLogger(__name__)
 
+# all collection classes, see registered_models()
+_model_registry = weakref.WeakSet()
+
 
 class CollectionMeta(type):
     def __new__(mcs, name, bases, attrs):
@@ -51,104 +60,654 @@ class CollectionMeta(type):
         for k in new_fields:
             attrs.pop(k)
 
+        for ref_name, ref in refs.items():
+            attrs[ref_name] = RelationshipAttribute(ref_name, ref)
+
+        key_field = attrs.get("_key_field")
+        if key_field is not None and key_field not in refs:
+            attrs[key_field] = KeyFieldAlias()
+
+        compact = attrs.get(
+            "_compact", any(getattr(b, "_compact", False) for b in bases)
+        )
+        if compact and "__slots__" not in attrs:
+            attrs["__slots__"] = _compact_slots(bases, attrs, new_fields)
+
+            if "__collection__" in attrs and not isinstance(
+                attrs["__collection__"], CollectionName
+            ):
+                attrs["__collection__"] = CollectionName(attrs["__collection__"])
+
         new_class = super_new(mcs, name, bases, attrs)
         new_class._fields = dict(
             getattr(new_class, "_fields", {}), **new_fields
         )
-        new_class._refs = refs
+        new_class._refs = dict(getattr(new_class, "_refs", {}), **refs)
+
+        # slots of fields (and system attributes) return Columns on the class,
+        # see __getattribute__
+        slot_columns = {name: name for name in _SYSTEM_COLUMNS}
+        slot_columns.update(
+            (field.attribute or name, name) for name, field in new_class._fields.items()
+        )
+        new_class._slot_columns = slot_columns
+
+        if getattr(new_class, "_trusted_load", False):
+            new_class._trusted_decoder = _compile_trusted_decoder(new_class)
+
+        if "_lazy_fields" not in attrs:
+            _model_registry.add(new_class)
 
         return new_class
 
+    def __getattribute__(cls, name):
+        "Return the Column of slotted fields instead of their slot descriptor"
+        value = type.__getattribute__(cls, name)
+        if type(value) is _SlotDescriptor:
+            column = type.__getattribute__(cls, "_slot_columns").get(name)
+            if column is not None:
+                return Column(cls, column)
+
+        return value
+
+    def __getattr__(cls, name):
+        "Return the Column of the field name for filter expressions"
+        fields_ = cls.__dict__.get("_fields")
+        if fields_ is None or name not in fields_:
+            raise AttributeError(
+                "type object '%s' has no attribute '%s'" % (cls.__name__, name)
+            )
+
+        return Column(cls, name)
+
+
+# slotted system attributes, returning a Column too on the class
+_SYSTEM_COLUMNS = ("_key", "_from", "_to")
+
+_SlotDescriptor = types.MemberDescriptorType
+
+
+def _compact_slots(bases, attrs, new_fields):
+    "Return __slots__ of a compact class, one slot per field not already slotted."
+    base_slots = set()
+    has_dict = False
+    all_fields = {}
+    for base in reversed(bases):
+        all_fields.update(getattr(base, "_fields", {}))
+        for klass in base.__mro__:
+            base_slots.update(klass.__dict__.get("__slots__", ()))
+            has_dict = has_dict or "__dict__" in klass.__dict__
+
+    all_fields.update(new_fields)
+
+    def inherited(name, default):
+        if name in attrs:
+            return attrs[name]
+        return next(
+            (getattr(b, name) for b in bases if hasattr(b, name)), default
+        )
+
+    key_field = inherited("_key_field", None)
+
+    slots = []
+    for name, field in all_fields.items():
+        attr = field.attribute or name
+        if attr == key_field or attr in base_slots or attr in slots:
+            continue
+
+        slots.append(attr)
+
+    # extra fields can't be known in advance
+    if inherited("_allow_extra_fields", False) and not has_dict:
+        slots.append("__dict__")
+
+    return tuple(slots)
+
+
+class CollectionName(object):
+    """
+    Data descriptor for __collection__ of objects without an instance __dict__.
+
+    Class access returns the class' collection name, instances can override it
+    (e.g. Relation('studies')).
+    """
+
+    def __init__(self, default=None):
+        self.default = default
+
+    def __get__(self, instance, owner):
+        if instance is None:
+            return self.default
+
+        name = instance._collection_name
+        return self.default if name is None else name
+
+    def __set__(self, instance, value):
+        object.__setattr__(instance, "_collection_name", value)
+
+
+class RelationshipAttribute(object):
+    """
+    Data descriptor installed by CollectionMeta for relationship() attributes.
+
+    The related document(s) are queried on first access and cached in the
+    instance's _refs_vals unless the relationship is defined with cache=False.
+    Accessing the attribute on the class returns the Relationship object.
+    """
+
+    def __init__(self, name, relationship):
+        self.name = name
+        self.relationship = relationship
+
+    def __get__(self, instance, owner):
+        if instance is None:
+            return self.relationship
+
+        refs_vals = instance._refs_cache
+        if refs_vals is not None and self.name in refs_vals:
+            return refs_vals[self.name]
+
+        db = getattr(instance, "_db", None)
+        if db is None:
+            raise DetachedInstanceError()
+
+        ref_class = self.relationship
+        query = db.query(ref_class.col_class)
+        if inspect.iscoroutinefunction(query.all):
+            raise TypeError(
+                "Relationship %r can't be loaded on access from an AsyncDatabase, "
+                "load it with Query.options(joinedload(%r))" % (self.name, self.name)
+            )
+
+        field_val = getattr(instance, ref_class.field)
+
+        r_val = None
+        if "_key" == ref_class.target_field:
+            r_val = query.by_key(field_val)
+
+            if ref_class.uselist is True:
+                r_val = [
+                    r_val,
+                ]
+
+        elif ref_class.uselist is False:
+            r_val = query.filter(
+                ref_class.target_field + "==@val", val=field_val
+            ).first()
+
+        else:
+            # TODO: Handle ref_class.order_by if present
+            r_val = query.filter(
+                ref_class.target_field + "==@val", val=field_val
+            ).all()
+
+        if ref_class.cache is True:
+            instance._refs_vals[self.name] = r_val
+
+        return r_val
+
+    def __set__(self, instance, value):
+        instance._refs_vals[self.name] = value
+
+
+class KeyFieldAlias(object):
+    """
+    Data descriptor installed by CollectionMeta for the _key_field attribute,
+    making it an alias of _key. On the class it's the Column of _key.
+    """
+
+    def __get__(self, instance, owner):
+        if instance is None:
+            return Column(owner, "_key")
+
+        return instance._key
+
+    def __set__(self, instance, value):
+        object.__setattr__(instance, "_key", value)
+
+
+class LazyDocument(object):
+    """
+    Mixin of the lazy document classes created by Collection._lazy_class.
+
+    Lazy documents keep the raw document dict they were created from and
+    deserialize a field through its marshmallow field when it's first
+    accessed. The value is then stored on the object like a normal field.
+    """
+
+    __slots__ = ()
+
+    _lazy_fields = {}
+
+    def __getattr__(self, name):
+        try:
+            field, data_key, load_default = self._lazy_fields[name]
+        except KeyError:
+            raise AttributeError(
+                "'%s' object has no attribute '%s'" % (type(self).__name__, name)
+            )
+
+        raw = self._raw
+        if data_key in raw:
+            value = field.deserialize(raw[data_key])
+        else:
+            value = load_default() if callable(load_default) else load_default
+
+        object.__setattr__(self, name, value)
+        if value is not None and self._snapshot is not None \
+                and isinstance(field, _MUTABLE_FIELDS):
+            self._record_stored(name)
+
+        return value
+
+    def _set_snapshot(self):
+        # fields are added to the snapshot when they're decoded
+        object.__setattr__(self, "_snapshot", _EMPTY_SNAPSHOT)
+
+    def __reduce__(self):
+        """
+        Pickle the object as an instance of the model class, decoding the
+        fields not accessed yet.
+        """
+        model = type(self).__bases__[-1]
+        for name in self._lazy_fields:
+            getattr(self, name)
+
+        slots = {}
+        for name in copyreg._slotnames(type(self)):
+            if name in ("_raw", "_instance_schema"):
+                continue
+
+            try:
+                slots[name] = object.__getattribute__(self, name)
+            except AttributeError:
+                pass
+
+        return (
+            copyreg._reconstructor,
+            (model, object, None),
+            (getattr(self, "__dict__", None) or None, slots),
+        )
+
+
+# Field types whose JSON representation is already the python value
+_TRUSTED_PASSTHROUGH = (
+    fields.Raw,
+    fields.String,
+    fields.Integer,
+    fields.Boolean,
+)
+
+
+def _trusted_converter(field):
+    """
+    Return the callable converting a stored JSON value of the given field or
+    None if the value can be used as is.
+    """
+    field_type = type(field)
+    if field_type in _TRUSTED_PASSTHROUGH:
+        return None
+
+    if field_type in (fields.Float, fields.Number):
+        return field.num_type
+
+    if (
+        field_type is fields.Dict
+        and field.key_field is None
+        and field.value_field is None
+    ):
+        return None
+
+    if field_type is fields.List and _trusted_converter(field.inner) is None:
+        return None
+
+    # dates, nested objects, decimals etc. go through the marshmallow field
+    return field.deserialize
+
+
+def _compile_trusted_decoder(cls):
+    """
+    Build the decoder used by Collection._load for trusted documents.
+
+    The decoder sets the attributes of a bare object directly from a document
+    dict, converting only the values that need it and skipping validation.
+    """
+    key_field = cls._key_field
+    plan = []
+    known_keys = set(["_id"])
+
+    for name, field in cls.get_objects_dict().items():
+        attr = field.attribute or name
+        if attr == key_field:
+            attr = "_key"
+
+        data_key = field.data_key or name
+        known_keys.add(data_key)
+
+        default = None if field.default is missing else field.default
+        load_default = default if field.missing is missing else field.missing
+        convert = None if field.dump_only else _trusted_converter(field)
+
+        plan.append(
+            (name, attr, data_key, field, convert, load_default, default,
+             field.dump_only)
+        )
+
+    allow_extra_fields = cls._allow_extra_fields
+
+    def decode(obj, in_dict, only=None, partial=()):
+        setattr_ = object.__setattr__
+
+        for name, attr, data_key, field, convert, load_default, default, dump_only in plan:
+            if dump_only:
+                value = default() if callable(default) else default
+
+            elif only is not None and name not in only:
+                if name in partial and in_dict.get(data_key) is not None:
+                    # some attributes of a nested value, see Query.returns()
+                    value = field.deserialize(in_dict[data_key], partial=True)
+                else:
+                    value = default() if callable(default) else default
+
+            elif data_key in in_dict:
+                value = in_dict[data_key]
+                if value is not None and convert is not None:
+                    value = convert(value)
+
+            else:
+                value = load_default() if callable(load_default) else load_default
+
+            setattr_(obj, attr, value)
+
+        if allow_extra_fields:
+            extra = set()
+            for k, v in in_dict.items():
+                if k not in known_keys:
+                    setattr_(obj, k, v)
+                    if not k.startswith("_"):
+                        extra.add(k)
+
+            if extra:
+                setattr_(obj, "_extra_fields", extra)
+
+    return decode
+
+
+# Python types dumped as is by the corresponding marshmallow fields
+_DUMP_PASSTHROUGH = {
+    fields.String: (str,),
+    fields.Integer: (int,),
+    fields.Float: (float,),
+    fields.Boolean: (bool,),
+}
+
+
+# Fields whose values (lists, dicts, objects) can be modified in place
+_MUTABLE_FIELDS = (
+    fields.Raw,
+    fields.List,
+    fields.Tuple,
+    fields.Mapping,
+    fields.Nested,
+)
+
+
+# Snapshot of stored objects without recorded values, see Collection._set_snapshot
+_EMPTY_SNAPSHOT = {}
+
+
+def _copy_json(value):
+    "Copy the lists and dicts of a JSON value."
+    if isinstance(value, dict):
+        return {k: _copy_json(v) for k, v in value.items()}
+
+    if isinstance(value, list):
+        return [_copy_json(v) for v in value]
+
+    return value
+
+
+class _CompiledDumper(object):
+    """
+    Dump function of an ObjectSchema, compiled on first use.
+
+    Produces the same dict as schema.dump(obj) but copies values already of the
+    field's python type (and all values of Raw fields) without going through
+    the marshmallow field.
+    """
+
+    def __init__(self, schema):
+        self.plan = []
+        # attribute name -> key in the dumped dict
+        self.data_keys = {}
+        # attributes holding values that can be modified in place and their keys
+        self.mutable_attrs = set()
+        self.mutable_keys = set()
+
+        for name, field in schema.dump_fields.items():
+            attr = field.attribute or name
+            data_key = field.data_key or name
+            self.data_keys[attr] = data_key
+
+            if isinstance(field, _MUTABLE_FIELDS):
+                self.mutable_attrs.add(attr)
+                self.mutable_keys.add(data_key)
+
+            field_type = type(field)
+            if field_type is fields.Raw:
+                fast_types = True
+            elif getattr(field, "as_string", False):
+                fast_types = None
+            else:
+                fast_types = _DUMP_PASSTHROUGH.get(field_type)
+
+            if "." in attr or not field._CHECK_ATTRIBUTE:
+                fast_types = None
+
+            self.plan.append((name, attr, data_key, field, fast_types))
+
+        self.get_attribute = schema.get_attribute
+
+    def __call__(self, obj, only=None):
+        data = {}
+        get_attribute = self.get_attribute
+
+        for name, attr, data_key, field, fast_types in self.plan:
+            if only is not None and name not in only and attr not in only:
+                continue
+
+            if fast_types is not None:
+                value = getattr(obj, attr, missing)
+                if value is None or fast_types is True or (
+                    value is not missing and type(value) in fast_types
+                ):
+                    data[data_key] = value
+                    continue
+
+            value = field.serialize(attr, obj, accessor=get_attribute)
+            if value is not missing:
+                data[data_key] = value
+
+        return data
+
 
 class ObjectSchema(Schema):
     object_class: callable = None
+    _dumper = None
+
     @post_load
     def make_object(self, data, **kwargs):
         return self.object_class(**data)
 
-    def __del__(self):
-        '''Help GC cleanup'''
-        self.fields = None
-        self.load_fields = None
-        self.dump_fields = None
+    def compiled_dumper(self):
+        "Return the _CompiledDumper of this schema."
+        if self._dumper is None:
+            self._dumper = _CompiledDumper(self)
+
+        return self._dumper
+
+    def dump_object(self, obj, only=None):
+        "Faster equivalent of dump(obj) for the fields named in only (or all)."
+        return self.compiled_dumper()(obj, only)
 
 class CollectionBase(with_metaclass(CollectionMeta)):
     "Base class for Collections, Nodes and Links"
 
+    __slots__ = ()
+
     _key_field = None
     _allow_extra_fields = False
     _collection_config = {}
 
+    # Build documents read from the database with the compiled trusted decoder
+    # instead of a full marshmallow load (no validation)
+    _trusted_load = False
+
+    # Store fields in __slots__ instead of a per instance __dict__
+    _compact = False
+
+    # Keep a snapshot of the stored values of objects loaded from or saved to
+    # the database, only_dirty updates then detect in place changes of lists,
+    # dicts and nested objects (costs a copy of these values per object)
+    _track_changes = False
+
+    # Maximum number of cached schemas limited to some fields (e.g. for
+    # Query.returns()), None for no limit
+    _schema_cache_size = 64
+
+    # Field name lists whose schemas warm_up_schemas() creates in advance
+    _schema_projections = ()
+
+    # When _dump validates the dumped data: "always", "first_write" (only
+    # fields modified since the object was created, loaded or saved) or
+    # "never" (trusted pipelines)
+    _dump_validation = "always"
+
     _inheritance_field = None
     _inheritance_mapping = {}
 
     @classmethod
     def get_objects_dict(cls):
-        objects_dict = cls._fields.copy()
+        objects_dict = cls.__dict__.get("_cls_objects_dict")
+        if objects_dict is None:
+            objects_dict = cls._fields.copy()
+
+            if cls is not CollectionBase:
+                for c in cls.__bases__:
+                    if issubclass(c, CollectionBase):
+                        base_objects_dict = c.get_objects_dict()
+                        for i, f in [(i, f) for i, f in base_objects_dict.items() if i not in objects_dict]:
+                            objects_dict[i] = f
 
-        if cls.__name__ != CollectionBase().__class__.__name__:
-            for c in cls.__bases__:
-                if issubclass(c,CollectionBase):
-                    base_objects_dict = c.get_objects_dict()
-                    for i, f in [(i, f) for i, f in base_objects_dict.items() if i not in objects_dict]:
-                        objects_dict[i] = f
+            cls._cls_objects_dict = objects_dict
 
-        return objects_dict
+        return objects_dict.copy()
 
     @classmethod
     def get_schema_class(cls):
         '''Return schema class (not an instance)'''
-        if (not hasattr(cls,'_cls_schema') or
-            cls._cls_schema.__name__ != cls.__name__ + "Schema"): 
-            #print("Getting schema " + cls.__name__)
-            cls._cls_schema = type(
+        # checking cls.__dict__ regenerates the schema class for subclasses
+        schema_class = cls.__dict__.get("_cls_schema")
+        if schema_class is None:
+            schema_class = cls._cls_schema = type(
                 cls.__name__ + "Schema", (ObjectSchema,), cls.get_objects_dict()
             )
-        return cls._cls_schema
+        return schema_class
 
     @classmethod
-    def schema(cls,only:typing.List[str]=None):
-        '''schema caches Marshmellow Schemas instance on this class to preserve memory'''
-        
-        # check if exist schema or regenerate in case of class inheritance
-        cls.get_schema_class()
+    def _make_schema(cls, only=None):
+        "Create a new schema instance for this class."
+        schema = cls.get_schema_class()(only=only)
 
         # Extra fields related schema configuration
-        unknown = EXCLUDE
-        if cls._allow_extra_fields is True:
-            unknown = INCLUDE 
-
-        if (not hasattr(cls,'_cls_schema_cache') or 
-            cls._cls_schema_cache[None].__class__.__name__ != cls.__name__ + "Schema"): 
-            #print(f'making {cls.__name__} schema with only=None')
-            SC = cls._cls_schema()
-            SC.unknown = unknown
-            SC.object_class = cls
-            cls._cls_schema_cache = {None:SC}
+        schema.unknown = INCLUDE if cls._allow_extra_fields is True else EXCLUDE
+        schema.object_class = cls
 
-        if only is not None:
-            #create a unique schema for this input by using a hashable set
-            if isinstance(only,(list,tuple)): 
-                onlyKey = str(set(only)) #garuntees order / uniquness and hashability
-            else:
-                onlyKey = only
-
-            if onlyKey not in cls._cls_schema_cache:
-                SC = cls._cls_schema(only=only)
-                SC.unknown = unknown
-                SC.object_class = cls
-                cls._cls_schema_cache[onlyKey] = SC #asssign the unique schema for only
-            
-            return cls._cls_schema_cache[onlyKey] #return the unique schema with onlykey
-        
-        else:
-            return cls._cls_schema_cache[None]
+        return schema
+
+    @classmethod
+    def schema(cls, only: typing.List[str] = None):
+        '''
+        Return the cached marshmallow schema instance of this class, limited to
+        the fields in only if given.
+
+        Schemas limited to some fields are kept in a LRU cache of
+        _schema_cache_size entries per class, keyed by the set of field names.
+        '''
+        full_schema = cls.__dict__.get("_cls_full_schema")
+        if full_schema is None:
+            full_schema = cls._cls_full_schema = cls._make_schema()
+
+        if only is None:
+            return full_schema
+
+        cache = cls.__dict__.get("_cls_schema_cache")
+        if cache is None:
+            cache = cls._cls_schema_cache = LRUCache(cls._schema_cache_size)
+
+        only = frozenset(only)
+        schema = cache.get(only)
+        if schema is None:
+            schema = cache[only] = cls._make_schema(only=only)
+
+        return schema
+
+    @classmethod
+    def schema_cache_info(cls):
+        "Return the statistics of the class' cache of schemas limited to some fields."
+        cache = cls.__dict__.get("_cls_schema_cache")
+        if cache is None:
+            return CacheInfo(0, 0, 0, cls._schema_cache_size, 0)
+
+        return cache.info()
+
+
+def registered_models():
+    "Return the collection classes defined so far that have a collection name."
+    return [
+        model for model in list(_model_registry)
+        if getattr(model, "__collection__", None)
+    ]
+
+
+def warm_up_schemas(models=None):
+    """
+    Build and cache the schemas of the given collection classes (default: all
+    registered models) ahead of their first use.
+
+    Besides the full schema, the schemas for the projections listed in each
+    class' _schema_projections are created and their dump functions (and
+    trusted decoders) compiled.
+    """
+    if models is None:
+        models = registered_models()
+
+    for model in models:
+        model.schema().compiled_dumper()
+        for only in model._schema_projections:
+            model.schema(only=only).compiled_dumper()
+
+        if model._trusted_load and "_trusted_decoder" not in model.__dict__:
+            model._trusted_decoder = _compile_trusted_decoder(model)
 
 
 class Collection(CollectionBase):
     """Base class for representing collections (or vertices as called in AranogDB)."""
 
-    __collection__ = None
+    __slots__ = (
+        "_key",
+        "_collection_name",
+        "_dirty_fields",
+        "_extra_fields",
+        "_snapshot",
+        "_unloaded",
+        "_refs_cache",
+        "_instance_schema",
+        "_db",
+        "_relations",
+    )
+
+    __collection__ = CollectionName()
 
     _safe_list = [
         "__collection__",
@@ -167,14 +726,11 @@ class Collection(CollectionBase):
     ]
 
     def __init__(self, collection_name=None, **kwargs):
+        self._init_state()
+
         if collection_name is not None:
             self.__collection__ = collection_name
 
-        self._dirty = set()
-        self._refs_vals = (
-            {}
-        )  # initialize container for relationship and graph_relationship values
-
         # cls._Schema().load(in_dict)
         if "_key" not in kwargs:
             self._key = None
@@ -194,18 +750,227 @@ class Collection(CollectionBase):
                 and self.__class__.__name__ in self._inheritance_mapping:
             setattr(self, self._inheritance_field, self._inheritance_mapping[self.__class__.__name__])
 
+    def _init_state(self):
+        "Initialize ORM bookkeeping attributes of a new object."
+        setattr_ = object.__setattr__
+        setattr_(self, "_key", None)
+        setattr_(self, "_collection_name", None)
+        # dirty fields set and relationship values dict are created on first use
+        setattr_(self, "_dirty_fields", None)
+        setattr_(self, "_refs_cache", None)
+        # names of extra (non field) attributes, see _allow_extra_fields
+        setattr_(self, "_extra_fields", None)
+        # document values as last loaded from or saved to the database
+        setattr_(self, "_snapshot", None)
+        # names of the fields not loaded from a partial document, see _load
+        setattr_(self, "_unloaded", None)
+
+    @classmethod
+    def _partial_fields(cls, only):
+        """
+        Return the names of the fields of which only some sub attributes are
+        in only (dotted names like "address.city").
+        """
+        return frozenset(name.split(".", 1)[0] for name in only or () if "." in name)
+
+    @classmethod
+    def _unloaded_fields(cls, only):
+        "Return the names of the fields not in only (None if all are)."
+        if only is None:
+            return None
+
+        unloaded = frozenset(
+            name for name in cls._fields
+            if name not in only and name != "_key" and name != cls._key_field
+        )
+
+        return unloaded or None
+
+    @classmethod
+    def _loaded_items(cls, in_dict, only):
+        "Return in_dict without the values of the fields not in only"
+        if only is None:
+            return in_dict
+
+        loaded = set(only).union(cls._partial_fields(only))
+        skipped = set(
+            field.data_key or name
+            for name, field in cls._fields.items()
+            if name not in loaded
+        )
+
+        return {k: v for k, v in in_dict.items() if k not in skipped or k == "_key"}
+
+    @property
+    def _dirty(self):
+        "Set of field names modified since the object was loaded or saved."
+        dirty = self._dirty_fields
+        if dirty is None:
+            dirty = set()
+            object.__setattr__(self, "_dirty_fields", dirty)
+
+        return dirty
+
+    @_dirty.setter
+    def _dirty(self, value):
+        object.__setattr__(self, "_dirty_fields", value)
+
+    def _set_snapshot(self):
+        """
+        Keep the dumped values of the object's lists, dicts and nested objects
+        as loaded from the database, they can be modified in place. The stored
+        values of other fields are recorded when they're first assigned.
+        """
+        dumper = self.schema().compiled_dumper()
+        unloaded = self._unloaded or ()
+        attrs = [
+            attr for attr in dumper.mutable_attrs
+            if attr not in unloaded and getattr(self, attr, None) is not None
+        ]
+
+        snapshot = _EMPTY_SNAPSHOT
+        if attrs:
+            snapshot = {k: _copy_json(v) for k, v in dumper(self, only=attrs).items()}
+
+        object.__setattr__(self, "_snapshot", snapshot)
+
+    def _record_stored(self, attr):
+        "Add the stored value of attr to the snapshot before it's modified."
+        snapshot = self._snapshot
+        dumper = self.schema().compiled_dumper()
+        data_key = dumper.data_keys.get(attr)
+        if data_key is None or data_key in snapshot:
+            return
+
+        if snapshot is _EMPTY_SNAPSHOT:
+            snapshot = {}
+            object.__setattr__(self, "_snapshot", snapshot)
+
+        snapshot[data_key] = _copy_json(dumper(self, only=(attr,)).get(data_key))
+
+    def _mark_saved(self, data, partial=False):
+        """
+        Record data written to the database as the object's stored state.
+
+        :param partial: data holds only the saved fields, the snapshot of the
+            others is kept.
+        """
+        if not self._track_changes:
+            self._dirty = None
+            return
+
+        snapshot = self._snapshot
+        if partial and snapshot is not None:
+            snapshot = dict(snapshot)
+        else:
+            snapshot = {}
+
+        mutable_keys = self.schema().compiled_dumper().mutable_keys
+        for k, v in data.items():
+            if k in mutable_keys and isinstance(v, (list, dict)):
+                snapshot[k] = _copy_json(v)
+            else:
+                snapshot.pop(k, None)
+
+        object.__setattr__(self, "_snapshot", snapshot or _EMPTY_SNAPSHOT)
+        self._dirty = None
+
+    def _update_dirty(self):
+        """
+        Compare the object with its snapshot and set _dirty to the fields whose
+        value actually changed, including in place changes of lists, dicts and
+        nested objects.
+        """
+        snapshot = self._snapshot
+        if snapshot is None:
+            return self._dirty
+
+        dumper = self.schema().compiled_dumper()
+        data_keys = dumper.data_keys
+        candidates = set(self._dirty_fields or ())
+        candidates.update(
+            attr for attr in dumper.mutable_attrs if data_keys[attr] in snapshot
+        )
+        if self._unloaded:
+            candidates.difference_update(self._unloaded)
+
+        current = dumper(self, only=candidates)
+
+        changed = set()
+        for attr in candidates:
+            data_key = data_keys.get(attr)
+            if (
+                data_key is None
+                or data_key not in snapshot
+                or current.get(data_key) != snapshot[data_key]
+            ):
+                changed.add(attr)
+
+        self._dirty = changed
+        return changed
+
+    @property
+    def _refs_vals(self):
+        "Cached values of relationship attributes."
+        refs_vals = self._refs_cache
+        if refs_vals is None:
+            refs_vals = {}
+            object.__setattr__(self, "_refs_cache", refs_vals)
+
+        return refs_vals
+
     def __setattr__(self, attr, value):
         a_real = attr
         if attr == self._key_field:
             a_real = "_key"
         if attr == "_id":
             return
+
+        unloaded = self._unloaded
+        if unloaded is not None and a_real in unloaded:
+            # the field is set, it isn't "not loaded" anymore
+            object.__setattr__(self, "_unloaded", unloaded - {a_real} or None)
+
+        elif self._snapshot is not None and a_real in self._fields:
+            # assigning the current value doesn't make a stored object dirty
+            old = getattr(self, a_real, missing)
+            if old is value or (type(old) is type(value) and old == value):
+                super(Collection, self).__setattr__(a_real, value)
+                return
+
+            self._record_stored(a_real)
+
         super(Collection, self).__setattr__(a_real, value)
 
         if a_real not in self._fields:
+            if (
+                self._allow_extra_fields
+                and not a_real.startswith("_")
+                and not hasattr(type(self), a_real)
+            ):
+                extra = self._extra_fields
+                if extra is None:
+                    extra = set()
+                    object.__setattr__(self, "_extra_fields", extra)
+
+                extra.add(a_real)
+
             return
 
-        self._dirty.add(a_real)
+        dirty = self._dirty_fields
+        if dirty is None:
+            dirty = self._dirty
+
+        dirty.add(a_real)
+
+    def __setstate__(self, state):
+        "Restore pickled or copied state, bypassing dirty tracking."
+        if not isinstance(state, tuple):
+            state = (state, None)
+
+        for attrs in state:
+            for k, v in (attrs or {}).items():
+                object.__setattr__(self, k, v)
 
     def __str__(self):
         ret = "<" + self.__class__.__name__
@@ -220,109 +985,33 @@ class Collection(CollectionBase):
     def __repr__(self):
         return self.__str__()
 
-    def __del__(self):
-        '''Removes references between schema and fields to help GC cleanup '''
-        for parm,field in self._fields.items(): #Clear Fields
-            if hasattr(field,'parent'): field.parent = None
-            if hasattr(field,'root'): field.root  = None
-
-        old_dirt = self._dirty
-        self._dirty = None #Clear Dirt Set References
-        del old_dirt
-
-        oldf = self._fields
-        self._fields = tuple()
-        del oldf
-
-    def __getattribute__(self, item):
-
-        # print("__getatttribute__ called!")
-        if item not in super(Collection, self).__getattribute__("_refs"):
-            key_field = super(Collection, self).__getattribute__("_key_field")
-            if item == key_field:
-                return super(Collection, self).__getattribute__("_key")
-            else:
-                return super(Collection, self).__getattribute__(item)
-
-        if item not in super(Collection, self).__getattribute__("_refs_vals"):
-            # print("trying to load ref val")
-            # pdb.set_trace()
-            if (
-                hasattr(self, "_db") is False
-                or super(Collection, self).__getattribute__("_db") is None
-            ):  # pylint: disable=E1101
-                raise DetachedInstanceError()
-
-            db = super(Collection, self).__getattribute__(
-                "_db"
-            )  # pylint: disable=E1101
-            ref_class = super(Collection, self).__getattribute__("_refs")[
-                item
-            ]  # pylint: disable=E1101
-
-            r_val = None
-            if "_key" == ref_class.target_field:
-                r_val = db.query(ref_class.col_class).by_key(
-                    super(Collection, self).__getattribute__(ref_class.field)
-                )  # pylint: disable=E1101
-
-                if ref_class.uselist is True:
-                    r_val = [
-                        r_val,
-                    ]
-
-            else:
-                if ref_class.uselist is False:
-                    r_val = (
-                        db.query(ref_class.col_class)
-                        .filter(
-                            ref_class.target_field + "==@val",
-                            val=super(Collection, self).__getattribute__(
-                                ref_class.field
-                            ),  # pylint: disable=E1101
-                        )
-                        .first()
-                    )
-
-                else:
-                    # TODO: Handle ref_class.order_by if present
-                    r_val = (
-                        db.query(ref_class.col_class)
-                        .filter(
-                            ref_class.target_field + "==@val",
-                            val=super(Collection, self).__getattribute__(
-                                ref_class.field
-                            ),  # pylint: disable=E1101
-                        )
-                        .all()
-                    )
-
-            if ref_class.cache is True:
-                super(Collection, self).__getattribute__("_refs_vals")[
-                    item
-                ] = r_val  # pylint: disable=E1101
-            else:
-                return r_val
+    @classmethod
+    def _load(cls, in_dict, only=None, instance=None, db=None, from_db=False):
+        """
+        Create object from given dict.
 
-        return super(Collection, self).__getattribute__("_refs_vals")[
-            item
-        ]  # pylint: disable=E1101
+        :param from_db: The dict is a document read from the database. For
+            classes with _trusted_load enabled it is decoded by the compiled
+            trusted decoder without validation.
+        """
+        if from_db and cls._trusted_load and not instance:
+            return cls._load_trusted(in_dict, only=only, db=db)
 
-    @classmethod
-    def _load(cls, in_dict, only=None, instance=None, db=None):
-        "Create object from given dict."
         if instance:
             in_dict = dict(instance._dump(), **in_dict)
 
-        # save the instance's creation schema,
-        # so we can dump the instance with the orginal schema
-        schema = cls.schema(only=only)
+        # documents with only some fields are loaded with partial=True, the
+        # fields not in only are recorded in _unloaded so they aren't dumped
+        schema = cls.schema()
 
         extra_fields = INCLUDE
         if cls._allow_extra_fields is False:
             extra_fields = EXCLUDE
 
-        data = schema.load(in_dict, unknown=extra_fields)
+        data = schema.load(
+            cls._loaded_items(in_dict, only), unknown=extra_fields, partial=only is not None
+        )
+        object.__setattr__(data, "_unloaded", cls._unloaded_fields(only))
 
         # add any extra fields present in in_dict into data
         # if cls._allow_extra_fields:
@@ -354,7 +1043,143 @@ class Collection(CollectionBase):
 
         if db is not None:
             # no dirty fields if initializing an object from db
-            new_obj._dirty.clear()
+            new_obj._dirty = None
+            if cls._track_changes:
+                new_obj._set_snapshot()
+
+        return new_obj
+
+    @classmethod
+    def _load_trusted(cls, in_dict, only=None, db=None):
+        "Create object from a database document using the trusted decoder."
+        decoder = cls.__dict__.get("_trusted_decoder")
+        if decoder is None:
+            # _trusted_load was enabled after the class was created
+            decoder = cls._trusted_decoder = _compile_trusted_decoder(cls)
+
+        new_obj = cls.__new__(cls)
+        new_obj._init_state()
+        if only is None:
+            decoder(new_obj, in_dict)
+        else:
+            decoder(new_obj, in_dict, only=only, partial=cls._partial_fields(only))
+            object.__setattr__(new_obj, "_unloaded", cls._unloaded_fields(only))
+
+        new_obj._instance_schema = cls.schema()
+        new_obj._db = db
+
+        if cls._inheritance_field is not None \
+                and getattr(new_obj, cls._inheritance_field) is None \
+                and cls.__name__ in cls._inheritance_mapping:
+            setattr(new_obj, cls._inheritance_field, cls._inheritance_mapping[cls.__name__])
+
+        if hasattr(new_obj, "_pre_process"):
+            new_obj._pre_process()
+
+        cls._load_system_fields(new_obj, in_dict)
+
+        if hasattr(new_obj, "_post_process"):
+            new_obj._post_process()
+
+        if db is None:
+            # same as objects initialized through the constructor
+            new_obj._dirty.update(cls._fields)
+        elif cls._track_changes:
+            new_obj._set_snapshot()
+
+        return new_obj
+
+    @classmethod
+    def _load_system_fields(cls, new_obj, in_dict):
+        "Set arangodb's system attributes (_key, _id) from a document."
+        if "_key" in in_dict and getattr(new_obj, "_key", None) is None:
+            object.__setattr__(new_obj, "_key", in_dict["_key"])
+
+        if "_id" in in_dict:
+            col_name = in_dict["_id"].split("/")[0]
+            if col_name != new_obj.__collection__:
+                new_obj.__collection__ = col_name
+
+    @classmethod
+    def _lazy_class(cls):
+        "Return the lazy document class for this collection class."
+        lazy_class = cls.__dict__.get("_lazy_cls")
+        if lazy_class is not None:
+            return lazy_class
+
+        lazy_fields = {}
+        for name, field in cls.schema().load_fields.items():
+            attr = field.attribute or name
+            if attr == cls._key_field:
+                continue
+
+            default = None if field.default is missing else field.default
+            load_default = default if field.missing is missing else field.missing
+            lazy_fields[attr] = (field, field.data_key or name, load_default)
+
+        lazy_class = type(cls)(
+            cls.__name__,
+            (LazyDocument, cls),
+            {
+                "__slots__": ("_raw",),
+                "__module__": cls.__module__,
+                "__qualname__": cls.__qualname__,
+                "_trusted_load": False,
+                "_lazy_fields": lazy_fields,
+                "_lazy_data_keys": frozenset(
+                    field.data_key or name for name, field in cls._fields.items()
+                ),
+            },
+        )
+        cls._lazy_cls = lazy_class
+
+        return lazy_class
+
+    @classmethod
+    def _load_lazy(cls, in_dict, only=None, db=None):
+        """
+        Create a lazy document from a database document.
+
+        The returned object is an instance of a subclass of cls which decodes
+        each field from in_dict on first access.
+        """
+        new_obj = cls._lazy_class().__new__(cls._lazy_class())
+        new_obj._init_state()
+        object.__setattr__(new_obj, "_raw", in_dict)
+        object.__setattr__(new_obj, "_unloaded", cls._unloaded_fields(only))
+
+        for name in cls._partial_fields(only):
+            field = cls._fields[name]
+            value = in_dict.get(field.data_key or name)
+            if value is not None:
+                value = field.deserialize(value, partial=True)
+            object.__setattr__(new_obj, field.attribute or name, value)
+
+        new_obj._instance_schema = cls.schema()
+        new_obj._db = db
+
+        if cls._allow_extra_fields:
+            extra = set()
+            for k, v in in_dict.items():
+                if k not in new_obj._lazy_data_keys and not k.startswith("_"):
+                    object.__setattr__(new_obj, k, v)
+                    extra.add(k)
+
+            if extra:
+                object.__setattr__(new_obj, "_extra_fields", extra)
+
+        if hasattr(new_obj, "_pre_process"):
+            new_obj._pre_process()
+
+        cls._load_system_fields(new_obj, in_dict)
+
+        if hasattr(new_obj, "_post_process"):
+            new_obj._post_process()
+
+        if db is None:
+            new_obj._dirty.update(cls._fields)
+        elif cls._track_changes:
+            new_obj._set_snapshot()
 
         return new_obj
 
@@ -363,26 +1188,24 @@ class Collection(CollectionBase):
     #     return self.schema().validate(self._dump())
 
     def _dump(self, only=None, **kwargs):
-        """Dump all object attributes into a dict."""
-        schema = None
-
-        if hasattr(self, "_instance_schema"):
-            schema = self._instance_schema
+        """
+        Dump all object attributes into a dict.
 
+        :param only: Names of the fields to dump, extra fields are included
+            only if listed too. Fields not loaded (see _load) are never dumped.
+        """
         if only is not None:
-            schema = self.schema(only=only)
-
-        if schema is None:
+            only = set(only)
             schema = self.schema()
+        else:
+            schema = getattr(self, "_instance_schema", None) or self.schema()
 
-        data = schema.dump(self)
+        if self._unloaded:
+            if only is None:
+                only = set(self._fields).union(self._extra_fields or ())
+            only.difference_update(self._unloaded)
 
-        # if errors:
-        #     raise SerializationError(
-        #         "Error dumping object of collection {} - {}".format(
-        #             self.__class__.__name__, errors
-        #         )
-        #     )
+        data = schema.dump_object(self, only=only)
 
         if "_key" not in data and hasattr(self, "_key"):
             data["_key"] = getattr(self, "_key")
@@ -391,25 +1214,29 @@ class Collection(CollectionBase):
             del data["_key"]
 
         # Also dump extra fields as is without any validation or conversion
-        if self._allow_extra_fields:
-            for prop in dir(self):
-                if hasattr(self.__class__, prop) and isinstance(
-                    getattr(self.__class__, prop),
-                    (property, Relationship, GraphRelationship),
-                ):
-
+        if self._allow_extra_fields and self._extra_fields:
+            for prop in self._extra_fields:
+                if prop in data or (only is not None and prop not in only):
                     continue
 
-                if (
-                    prop in data
-                    or callable(getattr(self, prop))
-                    or prop.startswith("_")
-                ):
-                    continue
+                value = getattr(self, prop, missing)
+                if value is not missing and not callable(value):
+                    data[prop] = value
 
-                data[prop] = getattr(self, prop)
+        if self._dump_validation == "always":
+            validation_errors = schema.validate(data, partial=only is not None)
 
-        validation_errors = schema.validate(data)
+        elif self._dump_validation == "first_write":
+            data_keys = schema._dumper.data_keys
+            changed = {
+                data_keys[f]: data[data_keys[f]]
+                for f in self._dirty_fields or ()
+                if f in data_keys and data_keys[f] in data
+            }
+            validation_errors = changed and schema.validate(changed, partial=True)
+
+        else:
+            validation_errors = None
 
         if validation_errors:
             raise ValidationError(validation_errors)
@@ -426,6 +1253,16 @@ class Collection(CollectionBase):
 
 class Relation(Collection):
 
+    __slots__ = (
+        "_from",
+        "_to",
+        "_object_from",
+        "_object_to",
+        "_collections_from",
+        "_collections_to",
+        "_next",
+    )
+
     _safe_list = [
         "__collection__",
         "_safe_list",
@@ -442,28 +1279,17 @@ class Relation(Collection):
         "_refs_vals",
     ]
 
-    def __init__(self, collection_name=None, **kwargs):
-
-        self._dirty = set()
-
-        if "_collections_from" in kwargs:
-            self._collections_from = kwargs["_collections_from"]
-        else:
-            self._collections_from = None
+    def _init_state(self):
+        "Initialize ORM bookkeeping and edge attributes of a new object."
+        super(Relation, self)._init_state()
 
-        if "_collections_to" in kwargs:
-            self._collections_to = kwargs["_collections_to"]
-        else:
-            self._collections_to = None
-
-        self._from = None
-        self._to = None
-        self._object_from = None
-        self._object_to = None
-
-        super(Relation, self).__init__(
-            collection_name=collection_name, **kwargs
-        )
+        setattr_ = object.__setattr__
+        setattr_(self, "_collections_from", None)
+        setattr_(self, "_collections_to", None)
+        setattr_(self, "_from", None)
+        setattr_(self, "_to", None)
+        setattr_(self, "_object_from", None)
+        setattr_(self, "_object_to", None)
 
     def __str__(self):
         ret = "<" + self.__class__.__name__ + "("
@@ -481,19 +1307,25 @@ class Relation(Collection):
         return ret
 
     @classmethod
-    def _load(cls, in_dict, only=None, instance=None, db=None):
+    def _load(cls, in_dict, only=None, instance=None, db=None, from_db=False):
         "Create object from given dict"
 
+        if from_db and cls._trusted_load and not instance:
+            return cls._load_trusted(in_dict, only=only, db=db)
+
         if instance:
             in_dict = dict(instance._dump(), **in_dict)
 
-        schema = cls.schema(only=only)
+        schema = cls.schema()
 
         extra_fields = INCLUDE
         if cls._allow_extra_fields is False:
             extra_fields = EXCLUDE
 
-        data = schema.load(in_dict, unknown=extra_fields)
+        data = schema.load(
+            cls._loaded_items(in_dict, only), unknown=extra_fields, partial=only is not None
+        )
+        object.__setattr__(data, "_unloaded", cls._unloaded_fields(only))
         # remove _id field
         # if "_id" in data:
         #     del data["_id"]
@@ -528,10 +1360,23 @@ class Relation(Collection):
 
         if db is not None:
             # no dirty fields if initializing an object from db
-            new_obj._dirty.clear()
+            new_obj._dirty = None
+            if cls._track_changes:
+                new_obj._set_snapshot()
 
         return new_obj
 
+    @classmethod
+    def _load_system_fields(cls, new_obj, in_dict):
+        "Set arangodb's system attributes (_key, _id, _from, _to) from a document."
+        super(Relation, cls)._load_system_fields(new_obj, in_dict)
+
+        if "_from" in in_dict:
+            object.__setattr__(new_obj, "_from", in_dict["_from"])
+
+        if "_to" in in_dict:
+            object.__setattr__(new_obj, "_to", in_dict["_to"])
+
     def _dump(self, only=None, **kwargs):
         """Dump all object attributes into a dict."""
         data = super(Relation, self)._dump(only=only, **kwargs)
@@ -14,14 +14,17 @@ log = logging.getLogger(__name__)
 class ConnectionPool(object):
     """Connection Pooler."""
 
-    def __init__(self, connections, dbname, username, password):
-        """Initialize connection pooler with ArangoClient connections."""
+    def __init__(self, connections, dbname, username, password, result_cache=None):
+        """
+        Initialize connection pooler with ArangoClient connections. The
+        result_cache is shared by the databases of the pool.
+        """
         self.pool = []
         self.conn_idx = 0
         assert connections
         for client in connections:
             d = client.db(dbname, username=username, password=password)
-            self.pool.append(Database(d))
+            self.pool.append(Database(d, result_cache=result_cache))
 
     @property
     def _db(self):
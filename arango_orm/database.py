@@ -12,22 +12,125 @@ from arango.database import StandardDatabase as ArangoDatabase
 from arango.exceptions import CollectionDeleteError
 
 # from arango.executor import DefaultExecutor
-from .collections import CollectionBase, Collection
-from .query import Query
+from .collections import CollectionBase, Collection, registered_models
+from .exceptions import DocumentNotFoundError
+from .query import Query, _check_missing, _chunks
 from .event import dispatch
 
 log = logging.getLogger(__name__)
 
 
+class _DocumentsLoader(object):
+    """
+    Loads documents of several collections by _id, used by get_many(). Each
+    collection name is mapped to the most general of the given collection
+    classes using it, documents of inheritance mapped classes get their
+    subclass.
+    """
+
+    def __init__(self, ids, only=None, missing="skip", models=None):
+        _check_missing(missing)
+        self.ids = list(ids)
+        self.missing = missing
+
+        if models is None:
+            models = registered_models()
+
+        names = set(_id.split("/", 1)[0] for _id in self.ids)
+        self._classes = {}
+        self._subclasses = {}
+        for name in names:
+            candidates = [m for m in models if m.__collection__ == name]
+            roots = [
+                m for m in candidates
+                if not any(o is not m and issubclass(m, o) for o in candidates)
+            ]
+            if len(roots) != 1:
+                raise ValueError(
+                    "%s collection classes found for %s, pass models"
+                    % ("No" if not roots else "Multiple", name)
+                )
+
+            root = self._classes[name] = roots[0]
+            if root._inheritance_field is not None:
+                self._subclasses[name] = {
+                    root._inheritance_mapping[m.__name__]: m
+                    for m in candidates
+                    if m.__name__ in root._inheritance_mapping
+                }
+
+        self.only = None
+        if only:
+            self.only = list(only)
+            if "_key" not in self.only:
+                self.only.insert(0, "_key")
+
+            keep = set(["_key", "_id"])
+            for model in self._classes.values():
+                if model._inheritance_field is not None:
+                    keep.add(model._inheritance_field)
+                for name in self.only:
+                    field = model._fields.get(name)
+                    if field is not None:
+                        keep.add(field.data_key or name)
+
+            self._keep = sorted(keep)
+            self.aql = "FOR id IN @_ids LET rec = DOCUMENT(id)\n RETURN rec ? KEEP(rec, @_keep) : null"
+        else:
+            self.aql = "FOR id IN @_ids\n RETURN DOCUMENT(id)"
+
+    def bind_vars(self, ids):
+        if self.only:
+            return {"_ids": ids, "_keep": self._keep}
+
+        return {"_ids": ids}
+
+    def load(self, rows, db):
+        "Return collection objects for the rows returned by the query"
+
+        records = []
+        missing_ids = []
+        for _id, rec in zip(self.ids, rows):
+            if rec is None:
+                missing_ids.append(_id)
+                if self.missing == "none":
+                    records.append(None)
+                continue
+
+            name = _id.split("/", 1)[0]
+            model = self._classes[name]
+            if name in self._subclasses:
+                model = self._subclasses[name].get(
+                    rec.get(model._inheritance_field), model
+                )
+
+            only = None
+            if self.only:
+                only = [f for f in self.only if f in model._fields]
+
+            records.append(model._load(rec, only=only, db=db, from_db=True))
+
+        if missing_ids and self.missing == "raise":
+            raise DocumentNotFoundError("%r not found" % missing_ids)
+
+        return records
+
+
 class Database(ArangoDatabase):
     """
     Serves similar to SQLAlchemy's session object with the exception that it
     also allows creating and dropping collections etc.
+
+    :param result_cache: ResultCache used by cached() queries, see
+        Query.cached().
     """
 
-    def __init__(self, db):
+    result_cache = None
+
+    def __init__(self, db, result_cache=None):
         """Create database instance."""
         self._db = db
+        self.result_cache = result_cache
         super(Database, self).__init__(db._conn)
 
     #         super(Database, self).__init__(
@@ -35,6 +138,12 @@ class Database(ArangoDatabase):
     #             executor=DefaultExecutor(connection)
     # )
 
+    def _invalidate_results(self, collection_name):
+        "Remove cached query results of the collection after writing to it"
+
+        if self.result_cache is not None:
+            self.result_cache.invalidate(collection_name)
+
     def _verify_collection(self, col):
         """
         Verifies that col is a collection class or object.
@@ -131,10 +240,12 @@ class Database(ArangoDatabase):
 
         collection = self._db.collection(entity.__collection__)
         setattr(entity, "_db", self)
-        res = collection.insert(entity._dump())
+        data = entity._dump()
+        res = collection.insert(data)
+        self._invalidate_results(entity.__collection__)
         if not getattr(entity, "_key", None) and "_key" in res:
             setattr(entity, "_key", res["_key"])
-        entity._dirty.clear()
+        entity._mark_saved(data)
 
         dispatch(entity, "post_add", db=self, result=res)
         return res
@@ -153,19 +264,14 @@ class Database(ArangoDatabase):
         collections = {}
         for entity in entity_list:
             collection_model = self._db.collection(entity.__collection__)
-            data = entity._dump()
 
             if only_dirty:
-                if not entity._dirty:
-                    return entity
+                if not entity._update_dirty():
+                    continue
                 dispatch(
                     entity, "pre_update", db=self
                 )  # In case of updates to fields
-                data = {
-                    k: v
-                    for k, v in entity._dump().items()
-                    if k == "_key" or k in entity._dirty
-                }
+                data = entity._dump(only=entity._dirty)
             else:
                 dispatch(entity, "pre_add", db=self)
                 data = entity._dump()
@@ -191,11 +297,12 @@ class Database(ArangoDatabase):
             entity_obj_list = data.get('entity_obj_list')
 
             res = collection_model.insert_many(entity_dict_list, **kwargs)
+            self._invalidate_results(collection)
             for num, entity in enumerate(entity_obj_list, start=0):
-                entity._dirty.clear()
                 log.debug(f"{entity} | {res[num]}")
                 if not getattr(entity, "_key", None) and "_key" in res[num]:
                     setattr(entity, "_key", res[num]["_key"])
+                entity._mark_saved(entity_dict_list[num], partial=only_dirty)
                 dispatch(entity, "post_add", db=self, result=res[num])
         return collections
 
@@ -205,6 +312,7 @@ class Database(ArangoDatabase):
 
         collection = self._db.collection(entity.__collection__)
         res = collection.delete(entity._dump(only=("_key",))["_key"], **kwargs)
+        self._invalidate_results(entity.__collection__)
 
         dispatch(entity, "post_delete", db=self, result=res)
         return res
@@ -219,26 +327,22 @@ class Database(ArangoDatabase):
     def update(self, entity, only_dirty=False, **kwargs):
         "Update given document"
         collection = self._db.collection(entity.__collection__)
-        data = entity._dump()
 
         if only_dirty:
-            if not entity._dirty:
+            if not entity._update_dirty():
                 return entity
             dispatch(
                 entity, "pre_update", db=self
             )  # In case of updates to fields
-            data = {
-                k: v
-                for k, v in entity._dump().items()
-                if k == "_key" or k in entity._dirty
-            }
+            data = entity._dump(only=entity._dirty)
         else:
             dispatch(entity, "pre_update", db=self)
             data = entity._dump()
 
         setattr(entity, "_db", self)
         res = collection.update(data, **kwargs)
-        entity._dirty.clear()
+        self._invalidate_results(entity.__collection__)
+        entity._mark_saved(data, partial=only_dirty)
 
         dispatch(entity, "post_update", db=self, result=res)
         return res
@@ -258,19 +362,14 @@ class Database(ArangoDatabase):
         collections = {}
         for entity in entity_list:
             collection_model = self._db.collection(entity.__collection__)
-            data = entity._dump()
 
             if only_dirty:
-                if not entity._dirty:
-                    return entity
+                if not entity._update_dirty():
+                    continue
                 dispatch(
                     entity, "pre_update", db=self
                 )  # In case of updates to fields
-                data = {
-                    k: v
-                    for k, v in entity._dump().items()
-                    if k == "_key" or k in entity._dirty
-                }
+                data = entity._dump(only=entity._dirty)
             else:
                 dispatch(entity, "pre_update", db=self)
                 data = entity._dump()
@@ -297,8 +396,9 @@ class Database(ArangoDatabase):
             entity_obj_list = data.get('entity_obj_list')
 
             res = collection_model.update_many(entity_dict_list, **kwargs)
+            self._invalidate_results(collection)
             for num, entity in enumerate(entity_obj_list, start=0):
-                entity._dirty.clear()
+                entity._mark_saved(entity_dict_list[num], partial=only_dirty)
                 dispatch(entity, "post_update", db=self, result=res[num])
         return collections
 
@@ -307,6 +407,26 @@ class Database(ArangoDatabase):
 
         return Query(CollectionClass, self)
 
+    def get_many(self, ids, only=None, missing="skip", models=None, chunk_size=1000):
+        """
+        Return the documents with given _ids, which can be of different
+        collections, as objects of their collection classes.
+
+        :param only: Load only these fields (and _key).
+        :param missing: What to do for _ids without a document, "skip" them,
+            "raise" DocumentNotFoundError or return "none" in their place.
+        :param models: Collection classes to use, by default all the collection
+            classes defined.
+        """
+
+        loader = _DocumentsLoader(ids, only=only, missing=missing, models=models)
+
+        rows = []
+        for chunk in _chunks(loader.ids, chunk_size):
+            rows.extend(self.aql.execute(loader.aql, bind_vars=loader.bind_vars(chunk)))
+
+        return loader.load(rows, self)
+
     def create_graph(self, graph_object, **kwargs):
         """
         Create a named graph from given graph object
@@ -23,3 +23,24 @@ class DocumentNotFoundError(Exception):
     """Document not found."""
 
     pass
+
+
+class NoResultFound(DocumentNotFoundError):
+    """Query.one() found no record."""
+
+    pass
+
+
+class MultipleResultsFound(Exception):
+    """Query.one() or Query.one_or_none() found more than one record."""
+
+    pass
+
+
+class RequestError(Exception):
+    """Error response of the database server (asyncio API)."""
+
+    def __init__(self, message, http_code=None, error_code=None):
+        super(RequestError, self).__init__(message)
+        self.http_code = http_code
+        self.error_code = error_code
@@ -0,0 +1,186 @@
+"""
+Explain Module
+--------------
+
+Query execution plans (see Query.explain() and Query.profile()) and an index
+advisor comparing the attributes a query filters and sorts on with the indexes
+declared in the model's _index list.
+"""
+
+import re
+from collections import namedtuple
+
+IndexAdvice = namedtuple("IndexAdvice", ["kind", "fields", "message"])
+
+_ATTRIBUTE_RE = re.compile(r"\brec\.([A-Za-z_]\w*(?:\.[A-Za-z_]\w*)*)")
+
+# index types which can't be used to sort or to filter by ranges
+_UNSORTED_INDEX_TYPES = ("fulltext", "geo", "ttl", "inverted", "zkd", "mdi")
+
+
+class QueryPlan(object):
+    """
+    Execution plan of a query.
+
+    :ivar plan: The plan as returned by the server.
+    :ivar nodes: Execution nodes of the plan.
+    :ivar indexes: Indexes used by the plan.
+    :ivar estimated_cost: Optimizer's estimated cost of the query.
+    :ivar estimated_items: Optimizer's estimated number of results.
+    :ivar runtimes: For profiled queries, list of dicts (id, type, calls,
+        items and runtime in seconds) per execution node.
+    :ivar execution_time: For profiled queries, total execution time.
+    """
+
+    def __init__(self, plan, stats=None, profile=None):
+        self.plan = plan
+        self.stats = stats or {}
+        self.profile = profile
+        self.nodes = plan.get("nodes", [])
+        self.estimated_cost = plan.get("estimatedCost")
+        self.estimated_items = plan.get("estimatedNrItems")
+        self.rules = plan.get("rules", [])
+
+        self.indexes = [
+            index
+            for node in self.nodes
+            if node["type"] == "IndexNode"
+            for index in node.get("indexes", [])
+        ]
+
+        node_types = {node["id"]: node["type"] for node in self.nodes}
+        self.runtimes = [
+            dict(node, type=node_types.get(node["id"]))
+            for node in self.stats.get("nodes", [])
+        ]
+        self.execution_time = self.stats.get(
+            "execution_time", self.stats.get("executionTime")
+        )
+
+    @property
+    def collection_scans(self):
+        "Nodes reading all documents of a collection"
+        return [n for n in self.nodes if n["type"] == "EnumerateCollectionNode"]
+
+    def uses_index(self, fields=None):
+        """
+        Return True if the plan uses an index, or an index on given fields
+        (leading fields of the index) if fields are given.
+        """
+
+        if fields is None:
+            return bool(self.indexes)
+
+        fields = list(fields)
+        return any(
+            index.get("fields", [])[:len(fields)] == fields for index in self.indexes
+        )
+
+    def __repr__(self):
+        return "<QueryPlan(cost={}, indexes={})>".format(
+            self.estimated_cost,
+            [index.get("fields") for index in self.indexes],
+        )
+
+
+def filter_attributes(query):
+    "Return the document attributes used in the query's filter conditions"
+
+    attributes = []
+    for fc in query._filter_conditions:
+        condition = fc["condition"]
+        if fc["prepend_rec_name"]:
+            condition = "rec." + condition
+        if fc.get("rec_name_placeholder"):
+            condition = condition.replace(fc["rec_name_placeholder"], "rec")
+
+        for attr in _ATTRIBUTE_RE.findall(condition):
+            if attr not in attributes:
+                attributes.append(attr)
+
+    return attributes
+
+
+def sort_attributes(query):
+    "Return the document attributes the query is sorted by"
+
+    return [sc.split()[0] for sc in query._sort_columns]
+
+
+def declared_indexes(model):
+    "Return the indexes of the model, including the primary (and edge) index"
+
+    indexes = [{"type": "primary", "fields": ["_key"]}]
+    if hasattr(model, "_from"):
+        indexes.append({"type": "edge", "fields": ["_from"]})
+        indexes.append({"type": "edge", "fields": ["_to"]})
+
+    return indexes + list(getattr(model, "_index", []))
+
+
+def advise_indexes(query, plan=None):
+    """
+    Return a list of IndexAdvice for the query. Without a plan only the
+    model's declared indexes are considered.
+
+    The kind of advice is one of "missing_filter_index" (no index covers the
+    filtered attributes), "missing_sort_index" (no index matches the sort
+    attributes), "full_scan" (the plan reads the whole collection) and
+    "unused_index" (a declared index on a filtered or sorted attribute is not
+    used by the plan).
+    """
+
+    model = query._CollectionClass
+    collection = model.__collection__
+    indexes = declared_indexes(model)
+    filtered = filter_attributes(query)
+    sorted_by = sort_attributes(query)
+    advice = []
+
+    if filtered and not any(index["fields"][0] in filtered for index in indexes):
+        advice.append(
+            IndexAdvice(
+                "missing_filter_index",
+                filtered,
+                "No index of %s covers the filtered attributes %s"
+                % (collection, ", ".join(filtered)),
+            )
+        )
+
+    if sorted_by and not any(
+        index["type"] not in _UNSORTED_INDEX_TYPES
+        and index["fields"][:len(sorted_by)] == sorted_by
+        for index in indexes
+    ):
+        advice.append(
+            IndexAdvice(
+                "missing_sort_index",
+                sorted_by,
+                "No index of %s matches the sort attributes %s"
+                % (collection, ", ".join(sorted_by)),
+            )
+        )
+
+    if plan is not None:
+        if (filtered or sorted_by) and plan.collection_scans:
+            advice.append(
+                IndexAdvice(
+                    "full_scan",
+                    filtered + [f for f in sorted_by if f not in filtered],
+                    "The query reads all documents of %s" % collection,
+                )
+            )
+
+        used = [index.get("fields") for index in plan.indexes]
+        for index in getattr(model, "_index", []):
+            if index["fields"][0] in filtered + sorted_by and index["fields"] not in used:
+                advice.append(
+                    IndexAdvice(
+                        "unused_index",
+                        index["fields"],
+                        "The %s index on %s of %s is not used"
+                        % (index["type"], ", ".join(index["fields"]), collection),
+                    )
+                )
+
+    return advice
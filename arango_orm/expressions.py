@@ -0,0 +1,280 @@
+"""
+Expressions Module
+------------------
+
+Filter expressions built from the fields of collection classes, e.g.
+``Student.age > 18`` or ``Student.name.in_(names)``. Query.filter() compiles
+them to AQL conditions passing all values as bind variables, so queries of the
+same shape always have the same AQL text.
+"""
+
+import json
+import re
+
+from marshmallow import fields
+
+_IDENTIFIER_RE = re.compile(r"^[A-Za-z_]\w*$")
+
+
+def _attribute(expr, name):
+    "Return AQL expression accessing attribute name of expr"
+
+    if _IDENTIFIER_RE.match(name):
+        return expr + "." + name
+
+    return "%s[%s]" % (expr, json.dumps(name))
+
+
+class Compiler(object):
+    """
+    Compiles expressions to AQL, collecting their values in bind_vars.
+
+    :param var: AQL variable of the document, "rec" in queries.
+    :param start: Number of the first bind variable (@_e<n>).
+    """
+
+    def __init__(self, var="rec", start=0):
+        self.var = var
+        self.start = start
+        self.bind_vars = {}
+
+    def bind(self, value):
+        "Return the name of a new bind variable (with @) holding value"
+
+        name = "_e%d" % (self.start + len(self.bind_vars))
+        self.bind_vars[name] = value
+
+        return "@" + name
+
+    def value(self, value, column=None):
+        "Return AQL for value, serialized by column's field unless an expression"
+
+        if isinstance(value, Expression):
+            return value.compile(self)
+
+        if column is not None:
+            value = column._serialize(value)
+
+        return self.bind(value)
+
+
+class Expression(object):
+    "Base class of expressions, combined using &, | and ~"
+
+    def compile(self, compiler):
+        "Return the AQL of the expression"
+        raise NotImplementedError()
+
+    def __and__(self, other):
+        return and_(self, other)
+
+    def __or__(self, other):
+        return or_(self, other)
+
+    def __invert__(self):
+        return not_(self)
+
+    def __bool__(self):
+        raise TypeError("Use & (and_), | (or_) and ~ (not_) to combine expressions")
+
+    __nonzero__ = __bool__
+
+
+class Column(Expression):
+    """
+    A (nested) attribute of the documents of a collection class, returned by
+    the class attributes of its fields (e.g. Student.name). Sub attributes of
+    nested fields are columns too (Student.address.city), as are attributes
+    given by name (Student.address["zip-code"]), e.g. if their names start
+    with an underscore or are names of Column methods.
+
+    :param model: Collection class.
+    :param name: Field or document attribute name.
+    :param field: Marshmallow field of the attribute, by default the model's
+        field of that name. Values compared with the column are serialized by
+        the field.
+    :param parent: Column of the nested field this is an attribute of.
+    """
+
+    def __init__(self, model, name, field=None, parent=None):
+        if field is None and parent is None:
+            field = model._fields.get(name)
+
+        # underscored, attribute access is for sub attributes
+        self._model = model
+        self._name = name
+        self._field = field
+
+        # attribute path in the documents
+        self._path = [] if parent is None else list(parent._path)
+        self._path.append(name if field is None else field.data_key or name)
+
+    def compile(self, compiler):
+        expr = compiler.var
+        for name in self._path:
+            expr = _attribute(expr, name)
+
+        return expr
+
+    def _serialize(self, value):
+        "Return value as stored in the database"
+
+        if value is None or self._field is None:
+            return value
+
+        return self._field._serialize(value, self._name, None)
+
+    def __getattr__(self, name):
+        if name.startswith("_"):
+            raise AttributeError(name)
+
+        return self[name]
+
+    def __getitem__(self, name):
+        field = self._field
+        if isinstance(field, fields.Nested):
+            field = field.schema.fields.get(name)
+        else:
+            field = None
+
+        return Column(self._model, name, field=field, parent=self)
+
+    def _compare(self, operator, value):
+        return Comparison(self, operator, value)
+
+    def __eq__(self, value):
+        return self._compare("==", value)
+
+    def __ne__(self, value):
+        return self._compare("!=", value)
+
+    def __lt__(self, value):
+        return self._compare("<", value)
+
+    def __le__(self, value):
+        return self._compare("<=", value)
+
+    def __gt__(self, value):
+        return self._compare(">", value)
+
+    def __ge__(self, value):
+        return self._compare(">=", value)
+
+    __hash__ = object.__hash__
+
+    def in_(self, values):
+        "The attribute's value is one of values"
+        return In(self, values)
+
+    def not_in(self, values):
+        "The attribute's value is none of values"
+        return In(self, values, negate=True)
+
+    def like(self, pattern, case_insensitive=False):
+        "The attribute's value matches the LIKE pattern (% and _ wildcards)"
+        return Like(self, pattern, case_insensitive)
+
+    def is_null(self):
+        "The attribute is null or missing"
+        return Comparison(self, "==", None)
+
+    def is_not_null(self):
+        "The attribute is set and not null"
+        return Comparison(self, "!=", None)
+
+    def __repr__(self):
+        return "<Column({}.{})>".format(self._model.__name__, ".".join(self._path))
+
+
+class Comparison(Expression):
+    "Comparison of a column with a value or another expression"
+
+    def __init__(self, column, operator, value):
+        self.column = column
+        self.operator = operator
+        self.value = value
+
+    def compile(self, compiler):
+        if self.value is None:
+            return "%s %s null" % (self.column.compile(compiler), self.operator)
+
+        return "%s %s %s" % (
+            self.column.compile(compiler),
+            self.operator,
+            compiler.value(self.value, self.column),
+        )
+
+
+class In(Expression):
+    "The column's value is (or isn't) in a list of values"
+
+    def __init__(self, column, values, negate=False):
+        self.column = column
+        self.values = values
+        self.negate = negate
+
+    def compile(self, compiler):
+        if isinstance(self.values, Expression):
+            values = self.values.compile(compiler)
+        else:
+            values = compiler.bind([self.column._serialize(v) for v in self.values])
+
+        return "%s %s %s" % (
+            self.column.compile(compiler),
+            "NOT IN" if self.negate else "IN",
+            values,
+        )
+
+
+class Like(Expression):
+    "The column's value matches a LIKE pattern"
+
+    def __init__(self, column, pattern, case_insensitive=False):
+        self.column = column
+        self.pattern = pattern
+        self.case_insensitive = case_insensitive
+
+    def compile(self, compiler):
+        return "LIKE(%s, %s, %s)" % (
+            self.column.compile(compiler),
+            compiler.value(self.pattern),
+            "true" if self.case_insensitive else "false",
+        )
+
+
+class BooleanClause(Expression):
+    "Expressions joined by AND or OR"
+
+    def __init__(self, operator, expressions):
+        self.operator = operator
+        self.expressions = expressions
+
+    def compile(self, compiler):
+        return "(%s)" % (" %s " % self.operator).join(
+            e.compile(compiler) for e in self.expressions
+        )
+
+
+class Not(Expression):
+    "Negation of an expression"
+
+    def __init__(self, expression):
+        self.expression = expression
+
+    def compile(self, compiler):
+        return "NOT (%s)" % self.expression.compile(compiler)
+
+
+def and_(*expressions):
+    "All of the expressions are true"
+    return BooleanClause("AND", expressions)
+
+
+def or_(*expressions):
+    "Any of the expressions is true"
+    return BooleanClause("OR", expressions)
+
+
+def not_(expression):
+    "The expression is false"
+    return Not(expression)
@@ -191,7 +191,7 @@ class Graph(object):
             for k in keys_to_del:
                 del doc_dict[k]
 
-        return CollectionClass._load(doc_dict)
+        return CollectionClass._load(doc_dict, from_db=True)
 
     def _objectify_results(self, results, doc_obj=None):
         """
@@ -235,7 +235,7 @@ class Graph(object):
 
                 else:
                     RelationClass = self.edges[col_name].__class__
-                    rel = RelationClass._load(e_dict)
+                    rel = RelationClass._load(e_dict, from_db=True)
                     rel._object_from = documents[rel._from]
                     rel._object_to = documents[rel._to]
 
@@ -1,21 +1,365 @@
 """
 A wrapper around python-arango's database class adding some SQLAlchemy like ORM methods to it.
 """
+import base64
+import copy
+import json
 import logging
+import queue
+import threading
+from array import array
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from inspect import isclass
 
 from arango.database import Database as ArangoDatabase
+from arango.exceptions import CollectionShardsError
+from marshmallow import fields as ma_fields
+
+from .aggregates import Aggregate
+from .cache import LRUCache
 from .collections import CollectionBase
-from .exceptions import DocumentNotFoundError
+from .exceptions import DocumentNotFoundError, MultipleResultsFound, NoResultFound
+from .explain import QueryPlan, advise_indexes
+from .expressions import Compiler, Expression, _attribute
 
 log = logging.getLogger(__name__)
 
+NAN = float("nan")
+
+# array.array typecodes of Query.to_columns() numeric columns
+_COLUMN_TYPECODES = (
+    (ma_fields.Boolean, "B"),
+    (ma_fields.Integer, "q"),
+    (ma_fields.Float, "d"),
+    (ma_fields.Number, "d"),
+)
+
+_NUMPY_DTYPES = {"B": "bool", "q": "int64", "d": "float64"}
+
+
+def _bool_appender(column):
+    "Return append function of a Boolean array column rejecting other values"
+
+    append = column.append
+
+    def append_bool(value):
+        if value is not True and value is not False:
+            raise TypeError("Not a boolean")
+
+        append(value)
+
+    return append_bool
+
+
+def _column_values(column):
+    "Return list of the values appended to an array column"
+
+    if column.typecode == "B":
+        return [bool(value) for value in column]
+
+    if column.typecode == "d":
+        # NaN is not valid JSON, only None values are stored as NaN
+        return [None if value != value else value for value in column]
+
+    return column.tolist()
+
+
+def _column_typecode(field):
+    "Return array typecode for the given marshmallow field or None"
+
+    for field_class, typecode in _COLUMN_TYPECODES:
+        if isinstance(field, field_class):
+            return typecode
+
+    return None
+
+
+def _seek_condition(keys, idx=0):
+    """
+    Return AQL condition selecting records sorted after the bind variables
+    @_seek_<n> for given (expression, operator) sort keys.
+    """
+
+    expr, op = keys[idx]
+    cond = "{0} {1} @_seek_{2}".format(expr, op, idx)
+
+    if idx + 1 == len(keys):
+        return cond
+
+    return "({0} OR ({1} == @_seek_{2} AND {3}))".format(
+        cond, expr, idx, _seek_condition(keys, idx + 1)
+    )
+
+
+def _chunks(items, size):
+    "Split items into lists of at most size items"
+
+    items = list(items)
+    return [items[i:i + size] for i in range(0, len(items), size)]
+
+
+def _check_missing(missing):
+    if missing not in ("skip", "raise", "none"):
+        raise ValueError("missing must be 'skip', 'raise' or 'none'")
+
+
+# aql.execute options not changing the results, not part of result cache keys
+_CURSOR_OPTIONS = ("batch_size", "stream", "memory_limit", "ttl")
+
+
+class _CachedResult(list):
+    "Rows of a cached query result, standing in for its cursor"
+
+    def __init__(self, rows, stats):
+        super(_CachedResult, self).__init__(rows)
+        self._stats = stats
+
+    def statistics(self):
+        return self._stats
+
+
+def _field_path(model, name):
+    "Return the document attribute path of a (dotted) field name of model"
+
+    top, _, rest = name.partition(".")
+    field = model._fields.get(top)
+    if field is not None and field.data_key:
+        top = field.data_key
+
+    return top + "." + rest if rest else top
+
+
+class JoinedLoad(object):
+    "Query option loading a relationship with the query, see joinedload()"
+
+    def __init__(self, name):
+        self.name = name
+
+    def __repr__(self):
+        return "<JoinedLoad({})>".format(self.name)
+
+
+def joinedload(name):
+    """
+    Query option (see Query.options()) loading the relationship attribute
+    name of the records in a subquery of the query itself, instead of
+    querying it on first access of each record.
+    """
+
+    return JoinedLoad(name)
+
+
+# returned along with the fields selected using Query.returns()
+_SYSTEM_ATTRIBUTES = ("_key", "_id", "_from", "_to")
+
+def _keep_expression(expr, tree, system=()):
+    """
+    Return AQL expression keeping the attributes of expr in tree, a dict of
+    attribute names to None (whole value) or a tree of sub attributes.
+    """
+
+    names = list(system) + [k for k, sub in tree.items() if sub is None]
+    nested = []
+    for k, sub in tree.items():
+        if sub is not None:
+            value = _attribute(expr, k)
+            nested.append(
+                "%s: IS_OBJECT(%s) ? %s : %s"
+                % (json.dumps(k), value, _keep_expression(value, sub), value)
+            )
+
+    if not names:
+        return "{%s}" % ", ".join(nested)
+
+    keep = "KEEP(%s, %s)" % (expr, ", ".join(json.dumps(k) for k in names))
+    if nested:
+        return "MERGE(%s, {%s})" % (keep, ", ".join(nested))
+
+    return keep
+
+
+class _BatchPrefetcher(object):
+    """
+    Iterate over the records of a cursor while a background thread fetches the
+    next batch from the server.
+    """
+
+    def __init__(self, cursor, depth=1):
+        self._cursor = cursor
+        # fetched batches waiting for the consumer
+        self._queue = queue.Queue(maxsize=depth)
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def _put(self, item):
+        "Queue item, return False if the consumer stopped iterating"
+        while not self._stop.is_set():
+            try:
+                self._queue.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+
+        return False
+
+    def _run(self):
+        try:
+            if not _put_batches(self._cursor, self._put):
+                return
+
+        except Exception as exc:  # pylint: disable=broad-except
+            self._put(exc)
+            return
+
+        self._put(None)
+
+    def __iter__(self):
+        try:
+            while True:
+                records = self._queue.get()
+                if records is None:
+                    return
+
+                if isinstance(records, Exception):
+                    raise records
+
+                for rec in records:
+                    yield rec
+        finally:
+            self._stop.set()
+
+
+def _put_batches(cursor, put):
+    """
+    Pass the batches of the cursor to put as they are fetched. Return False
+    (closing the cursor) if put returns False.
+    """
+
+    while True:
+        batch = cursor.batch()
+        records = list(batch)
+        batch.clear()
+
+        if records and not put(records):
+            cursor.close(ignore_missing=True)
+            return False
+
+        if not cursor.has_more():
+            return True
+
+        cursor.fetch()
+
+
+class _PartitionScanner(_BatchPrefetcher):
+    """
+    Iterate over the batches of records of several queries run concurrently by
+    a thread pool, in the order the batches arrive.
+    """
+
+    def __init__(self, queries, return_clause, workers, **cursor_options):
+        self._remaining = len(queries)
+        self._queue = queue.Queue(maxsize=2 * workers)
+        self._stop = threading.Event()
+        self._executor = ThreadPoolExecutor(workers, "arango_orm_scan")
+        for query in queries:
+            self._executor.submit(self._scan, query, return_clause, cursor_options)
+
+    def _scan(self, query, return_clause, cursor_options):
+        if self._stop.is_set():
+            return
+
+        try:
+            cursor = query._execute(return_clause, **cursor_options)
+            if not _put_batches(cursor, self._put):
+                return
+
+        except Exception as exc:  # pylint: disable=broad-except
+            self._put(exc)
+            return
+
+        self._put(None)
+
+    def __iter__(self):
+        try:
+            while self._remaining:
+                records = self._queue.get()
+                if records is None:
+                    self._remaining -= 1
+                    continue
+
+                if isinstance(records, Exception):
+                    raise records
+
+                yield records
+        finally:
+            self._stop.set()
+            self._executor.shutdown(wait=False)
+
+
+# key of the document at an offset in _key order, see Query._key_ranges()
+_KEY_BOUND_AQL = "FOR rec IN @@collection SORT rec._key LIMIT @_offset, 1 RETURN rec._key"
+
+
+def _key_bound_vars(collection, total, partitions):
+    "Return the bind variables of the _KEY_BOUND_AQL queries splitting a collection"
+
+    return [
+        {"@collection": collection, "_offset": idx * total // partitions}
+        for idx in range(1, partitions)
+    ]
+
+
+def _ranges_between(bounds):
+    "Return the (low, high) ranges between sorted keys, unbounded at both ends"
+
+    edges = [None]
+    for key in bounds:
+        if key != edges[-1]:
+            edges.append(key)
+    edges.append(None)
+
+    return list(zip(edges[:-1], edges[1:]))
+
+
+def _transform_batch(transform, records):
+    "Apply transform to records, run by Query.parallel_iter() process pools"
+
+    return [transform(rec) for rec in records]
+
+
+class Page(list):
+    """
+    A page of records returned by Query.paginate() or Query.page().
+
+    next_token is the continuation token of the next page, None for the last
+    page. total is the number of records matching the query (pages returned
+    by page() only) and offset the position of the page's first record.
+    """
+
+    def __init__(self, records, next_token=None, total=None, offset=0):
+        super(Page, self).__init__(records)
+        self.next_token = next_token
+        self.total = total
+        self.offset = offset
+
+    @property
+    def has_next(self):
+        if self.total is not None:
+            return self.offset + len(self) < self.total
+
+        return self.next_token is not None
+
 
 class Query(object):
     """
     Class used for querying records from an arangodb collection using a database connection
     """
 
+    # Process wide cache of AQL texts by query shape, see _make_aql()
+    _aql_cache = LRUCache(1024)
+
     def __init__(self, CollectionClass, db=None):
 
         self._db = db
@@ -24,32 +368,49 @@ class Query(object):
         self._filter_conditions = []
         self._sort_columns = []
         self._return_fields = None
+        self._group_fields = None
+        # relationships loaded with the records, see options()
+        self._joins = []
         self._limit = None
         self._limit_start_record = 0
         self._cursor_ttl = None
+        self._cache_results = False
+        self._cache_ttl = None
+        # number of bind variables of filter expressions (@_e<n>)
+        self._expression_vars = 0
 
     def count(self):
-        "Return collection count"
+        """
+        Return the number of records matching the query. Without filters and
+        limit the collection's document count is returned instead of counting
+        the records with AQL.
+        """
+
+        if self._counts_collection():
+            return self._db.collection(self._CollectionClass.__collection__).count()
 
-        # return self._db.collection(self._CollectionClass.__collection__).count()
-        aql = self._make_aql()
+        aql = self._make_aql(
+            "\n COLLECT WITH COUNT INTO rec_count RETURN rec_count"
+        )
 
-        aql += "\n COLLECT WITH COUNT INTO rec_count RETURN rec_count"
-        # print(aql)
+        return next(iter(self._run(aql)))
 
-        results = self._db.aql.execute(aql, bind_vars=self._bind_vars)
+    def _counts_collection(self):
+        "Return True if the query matches all records of the collection"
 
-        return next(results)
+        return not self._filter_conditions and not self._limit
 
     def full_count(self):
-        "Return collection full count"
+        "Return the number of records matching the query ignoring its limit"
 
-        aql = self._make_aql()
+        return self._without_limit().count()
 
-        aql += "\n RETURN rec"
+    def _without_limit(self):
+        query = self._clone()
+        query._limit = None
+        query._limit_start_record = 0
 
-        cursor = self._db.aql.execute(aql, bind_vars=self._bind_vars, full_count=True)
-        return cursor.statistics()['fullCount']
+        return query
 
     def by_key(self, key, **kwargs):
         "Return a single document using it's key"
@@ -63,7 +424,78 @@ class Query(object):
                 % (self._CollectionClass.__collection__, key)
             )
 
-        return self._CollectionClass._load(doc_dict, db=self._db)
+        return self._CollectionClass._load(doc_dict, db=self._db, from_db=True)
+
+    def by_keys(self, keys, preserve_order=True, missing="skip", only=None, chunk_size=1000):
+        """
+        Return the documents with given keys using one query per chunk_size
+        keys. Like by_key() filters are not applied.
+
+        :param preserve_order: Return the documents in the order of keys.
+            Otherwise the order is up to the server (missing="skip" only).
+        :param missing: What to do for keys without a document, "skip" them,
+            "raise" DocumentNotFoundError or return "none" in their place.
+        :param only: Load only these fields (and _key), like returns().
+        """
+
+        keys = list(keys)
+        query, aql = self._by_keys_query(preserve_order, missing, only)
+
+        rows = []
+        for chunk in _chunks(keys, chunk_size):
+            rows.extend(
+                self._db.aql.execute(aql, bind_vars=self._by_keys_vars(chunk))
+            )
+
+        return query._by_keys_records(keys, rows, missing)
+
+    def _by_keys_query(self, preserve_order, missing, only):
+        "Return the query (projection) and AQL used by by_keys()"
+
+        _check_missing(missing)
+
+        query = self._clone()
+        if only:
+            query.returns(*only)
+
+        if preserve_order or missing != "skip":
+            aql = (
+                "FOR key IN @_keys LET rec = DOCUMENT(@@collection, key)\n"
+                " RETURN rec ? %s : null" % query._return_clause()
+            )
+        else:
+            aql = (
+                "FOR rec IN DOCUMENT(@@collection, @_keys)\n RETURN %s"
+                % query._return_clause()
+            )
+
+        return query, aql
+
+    def _by_keys_vars(self, keys):
+        return {"@collection": self._bind_vars["@collection"], "_keys": keys}
+
+    def _by_keys_records(self, keys, rows, missing):
+        "Load the documents returned by a _by_keys_query() query"
+
+        if missing == "skip":
+            return [self._load_record(rec) for rec in rows if rec is not None]
+
+        records = []
+        missing_keys = []
+        for key, rec in zip(keys, rows):
+            if rec is None:
+                missing_keys.append(key)
+                records.append(None)
+            else:
+                records.append(self._load_record(rec))
+
+        if missing_keys and missing == "raise":
+            raise DocumentNotFoundError(
+                "(%s %r) not found"
+                % (self._CollectionClass.__collection__, missing_keys)
+            )
+
+        return records
 
     def filter(
         self,
@@ -77,8 +509,19 @@ class Query(object):
         Filter the results based on given condition. By default filter conditions are joined
         by AND operator if this method is called multiple times. If you want to use the OR operator
         then specify _or=True
+
+        The condition is an AQL string or an expression of the collection's
+        fields like Student.age >= 18 (see arango_orm.expressions), whose values
+        are passed as bind variables.
         """
 
+        if isinstance(condition, Expression):
+            compiler = Compiler(start=self._expression_vars)
+            condition = condition.compile(compiler)
+            prepend_rec_name = False
+            kwargs.update(compiler.bind_vars)
+            self._expression_vars += len(compiler.bind_vars)
+
         joiner = None
         if len(self._filter_conditions) > 0:
             joiner = "OR" if _or else "AND"
@@ -129,32 +572,256 @@ class Query(object):
 
         return self
 
+    def options(self, *options):
+        """
+        Set loading options, e.g. joinedload("teacher") to load the teacher
+        relationship of the records with the query.
+        """
+
+        refs = self._CollectionClass._refs
+        for option in options:
+            if not isinstance(option, JoinedLoad):
+                raise TypeError("Unknown query option: %r" % (option,))
+
+            ref = refs.get(option.name)
+            if ref is None:
+                raise ValueError(
+                    "%s has no relationship %s"
+                    % (self._CollectionClass.__name__, option.name)
+                )
+
+            if not ref.cache:
+                # uncached relationships are queried on every access
+                raise ValueError(
+                    "Relationship %s can't be joined, it's not cached" % option.name
+                )
+
+            if option.name not in self._joins:
+                self._joins.append(option.name)
+
+        return self
+
+    def _joins_aql(self):
+        """
+        Return the LET subqueries of the joinedload() relationships, reading
+        their collections from the @@_join<n> bind variables.
+        """
+
+        lets = []
+        for idx, name in enumerate(self._joins):
+            ref = self._CollectionClass._refs[name]
+            lets.append(
+                "\n LET rec_join_%d = (FOR ref IN @@_join%d FILTER ref.%s == rec.%s%s RETURN ref)"
+                % (
+                    idx,
+                    idx,
+                    _field_path(ref.col_class, ref.target_field),
+                    self._attribute_path(ref.field),
+                    "" if ref.uselist else " LIMIT 1",
+                )
+            )
+
+        return "".join(lets)
+
+    def _joined_collections(self):
+        "Return the collection names of the joinedload() relationships"
+
+        return [
+            self._CollectionClass._refs[name].col_class.__collection__
+            for name in self._joins
+        ]
+
+    def _select_aql(self, return_clause, joins=True):
+        """
+        Return the AQL of the query returning given expression for each record
+        and its bind variables.
+
+        :param joins: Run the joinedload() subqueries, whose values the
+            _load_clause() returns.
+        """
+
+        if not joins or not self._joins:
+            return self._make_aql("\n RETURN " + return_clause), self._bind_vars
+
+        aql = self._make_aql(self._joins_aql() + "\n RETURN " + return_clause)
+
+        # copied after _make_aql() added the bind variables of the limit
+        bind_vars = dict(self._bind_vars)
+        for idx, collection in enumerate(self._joined_collections()):
+            bind_vars["@_join%d" % idx] = collection
+
+        return aql, bind_vars
+
+    def _result_collections(self, bind_vars):
+        """
+        Return the names of the collections read by the query run with
+        bind_vars, whose writes invalidate its cached results.
+        """
+
+        return (self._CollectionClass.__collection__,) + tuple(
+            value for name, value in bind_vars.items() if name.startswith("@_join")
+        )
+
+    def _load_clause(self):
+        """
+        Return the RETURN expression of the records to load, an array of the
+        record and the joinedload() relationships' values if any.
+        """
+
+        if not self._joins:
+            return self._return_clause()
+
+        values = [self._return_clause()]
+        for idx, name in enumerate(self._joins):
+            uselist = self._CollectionClass._refs[name].uselist
+            values.append("rec_join_%d%s" % (idx, "" if uselist else "[0]"))
+
+        return "[%s]" % ", ".join(values)
+
+    def _set_joined(self, obj, values):
+        "Store the joinedload() relationships' values of obj in its _refs_vals"
+
+        for name, value in zip(self._joins, values):
+            ref = self._CollectionClass._refs[name]
+            query = Query(ref.col_class, self._db)
+            if ref.uselist:
+                value = [query._load_record(doc) for doc in value]
+            elif value is not None:
+                value = query._load_record(value)
+
+            obj._refs_vals[name] = value
+
     def returns(self, *fields):
+        """
+        Return only the given fields (and _key, _id) of the records. Sub
+        attributes of nested fields can be selected using dotted names like
+        "address.city". Fields not returned are not written back by updates of
+        the loaded objects.
+        """
+        self._check_fields(fields)
+        self._return_fields = list(fields)
+
+        return self
+
+    def _check_fields(self, fields):
+        "Raise RuntimeError if a (dotted) field name is not a collection field"
+
         CC = self._CollectionClass
-        self._return_fields = []
         for f in fields:
-            if f not in CC._fields:
+            if f.split(".", 1)[0] not in CC._fields:
                 raise RuntimeError("field spec is denied: %s" % f)
-            fo = CC._fields[f]
-            fo.name = f
-            self._return_fields.append(fo)
+
+    def group_by(self, *fields):
+        """
+        Group the records by the given fields for aggregate(). Sub attributes of
+        nested fields can be grouped by using dotted names like "address.city".
+        """
+
+        self._check_fields(fields)
+        self._group_fields = list(fields)
 
         return self
 
-    def _make_aql(self):
-        "Make AQL statement from filter, sort and limit expressions"
+    def aggregate(self, **aggregates):
+        """
+        Return a list of dicts, one per group of the group_by() fields, with the
+        group's field values and the given aggregates (see
+        arango_orm.aggregates) computed on the server. Without group_by() a
+        single dict aggregating all records is returned in the list.
+
+        Filters, sort and limit apply to the records before grouping, groups
+        are sorted by their field values.
+        """
+
+        return list(self._run(self._aggregate_aql(aggregates)))
+
+    def _aggregate_aql(self, aggregates):
+        "Return AQL of aggregate() collecting the records into groups"
+
+        groups = self._group_fields or []
+        if not groups and not aggregates:
+            raise ValueError("aggregate() requires aggregates or group_by() fields")
+
+        for name, agg in aggregates.items():
+            if not isinstance(agg, Aggregate):
+                raise TypeError("%s is not an Aggregate: %r" % (name, agg))
+            if agg.field is not None:
+                self._check_fields([agg.field])
+
+        tail = "\n COLLECT"
+        if groups:
+            tail += " " + ", ".join(
+                "grp%d = rec.%s" % (i, self._attribute_path(f))
+                for i, f in enumerate(groups)
+            )
+        if aggregates:
+            tail += " AGGREGATE " + ", ".join(
+                "agg%d = %s" % (i, agg.expression(self))
+                for i, agg in enumerate(aggregates.values())
+            )
+
+        values = ["%s: grp%d" % (json.dumps(f), i) for i, f in enumerate(groups)]
+        values += ["%s: agg%d" % (json.dumps(n), i) for i, n in enumerate(aggregates)]
+
+        return self._make_aql(tail + " RETURN {%s}" % ", ".join(values))
+
+    @classmethod
+    def aql_cache_info(cls):
+        "Return hits, misses and size of the process wide AQL text cache."
+        return cls._aql_cache.info()
+
+    def _shape(self):
+        "Return a hashable fingerprint of the query's structure (not its values)"
+
+        return (
+            tuple(
+                (
+                    fc["condition"],
+                    fc["joiner"],
+                    fc["prepend_rec_name"],
+                    fc.get("rec_name_placeholder"),
+                )
+                for fc in self._filter_conditions
+            ),
+            tuple(self._sort_columns),
+            bool(self._limit),
+        )
+
+    def _make_aql(self, tail=""):
+        """
+        Make AQL statement from filter, sort and limit expressions followed by
+        given tail (e.g. a RETURN clause).
+
+        The text is cached by the query's shape, filter values and limits are
+        passed as bind variables so the same text is reused.
+        """
+
+        if self._limit:
+            self._bind_vars["_limit_offset"] = self._limit_start_record
+            self._bind_vars["_limit_count"] = self._limit
+        else:
+            self._bind_vars.pop("_limit_offset", None)
+            self._bind_vars.pop("_limit_count", None)
+
+        key = (self._shape(), tail)
+        aql = self._aql_cache.get(key)
+        if aql is None:
+            aql = self._aql_cache[key] = self._compile_aql() + tail
+
+        log.debug(aql)
+
+        return aql
+
+    def _compile_aql(self):
+        "Build AQL statement from filter, sort and limit expressions"
 
         # Order => FILTER, SORT, LIMIT
-        aql = "FOR rec IN @@collection\n"
+        parts = ["FOR rec IN @@collection\n"]
 
         # Process filter conditions
 
         for fc in self._filter_conditions:
-            line = ""
-            if fc["joiner"] is None:
-                line = "FILTER "
-            else:
-                line = fc["joiner"] + " "
+            line = "FILTER " if fc["joiner"] is None else fc["joiner"] + " "
 
             if fc["prepend_rec_name"]:
                 line += "rec."
@@ -165,36 +832,44 @@ class Query(object):
             if rec_ph:
                 line = line.replace(rec_ph, "rec")
 
-            aql += line + " "
+            parts.append(line + " ")
 
         # Process Sort
         if self._sort_columns:
-            aql += "\n SORT"
-
-            for sc in self._sort_columns:
-                aql += " rec." + sc + ","
-
-            aql = aql[:-1]
+            parts.append(
+                "\n SORT " + ", ".join("rec." + sc for sc in self._sort_columns)
+            )
 
         # Process Limit
         if self._limit:
-            aql += "\n LIMIT {}, {} ".format(
-                self._limit_start_record, self._limit
-            )
+            parts.append("\n LIMIT @_limit_offset, @_limit_count ")
 
-        log.debug(aql)
+        return "".join(parts)
 
-        return aql
+    def update(self, wait_for_sync=True, ignore_errors=False, returning=None, **kwargs):
+        """
+        Update the matching records with the field values in kwargs.
+
+        :param returning: What to return, None for the cursor, "count" for the
+            number of updated records, "new" or "old" for a list of the updated
+            records after or before the update (with the fields selected using
+            returns() if any).
+        """
 
-    def update(self, wait_for_sync=True, ignore_errors=False, **kwargs):
+        aql = self._update_aql(wait_for_sync, ignore_errors, returning, **kwargs)
+        cursor = self._db.aql.execute(aql, bind_vars=self._bind_vars)
+        self._db._invalidate_results(self._CollectionClass.__collection__)
+
+        return self._write_result(cursor, returning)
+
+    def _update_aql(self, wait_for_sync, ignore_errors, returning=None, **kwargs):
+        "Return AQL updating the matching records with kwargs"
 
         options = " OPTIONS {waitForSync: %s, ignoreErrors: %s}" % (
             str(wait_for_sync).lower(),
             str(ignore_errors).lower(),
         )
 
-        aql = self._make_aql()
-
         # Since we might already have the normal field names in self._bind_vars from filter
         # condition(s) we'll store the update variables with a different prefix "_up_" to avoid
         # field name collisions
@@ -212,28 +887,83 @@ class Query(object):
         if len(update_clause) > 0:
             update_clause = update_clause[:-1]
 
-        aql += (
+        aql = self._make_aql(
             "\n UPDATE {_key: rec._key} WITH {%s} IN @@collection"
             % update_clause
             + options
+            + self._returning_clause(returning, ("new", "old"))
         )
         log.info(aql)
         log.info(self._bind_vars)
 
-        return self._db.aql.execute(aql, bind_vars=self._bind_vars)
+        return aql
 
-    def delete(self, wait_for_sync=True, ignore_errors=False):
+    def delete(self, wait_for_sync=True, ignore_errors=False, returning=None):
+        """
+        Remove the matching records.
+
+        :param returning: What to return, None for the cursor, "count" for the
+            number of removed records or "old" for a list of the removed
+            records (with the fields selected using returns() if any).
+        """
+
+        aql = self._delete_aql(wait_for_sync, ignore_errors, returning)
+        cursor = self._db.aql.execute(aql, bind_vars=self._bind_vars)
+        self._db._invalidate_results(self._CollectionClass.__collection__)
+
+        return self._write_result(cursor, returning)
+
+    def _delete_aql(self, wait_for_sync, ignore_errors, returning=None):
+        "Return AQL removing the matching records"
 
         options = " OPTIONS {waitForSync: %s, ignoreErrors: %s}" % (
             str(wait_for_sync).lower(),
             str(ignore_errors).lower(),
         )
 
-        aql = self._make_aql()
+        return self._make_aql(
+            "\n REMOVE {_key: rec._key} IN @@collection"
+            + options
+            + self._returning_clause(returning, ("old",))
+        )
+
+    def _returning_clause(self, returning, documents):
+        "Return the RETURN clause of an update or delete for returning"
+
+        if returning is None or returning == "count":
+            return ""
+
+        if returning not in documents:
+            raise ValueError(
+                "returning must be None, 'count' or one of %s" % ", ".join(documents)
+            )
+
+        return " RETURN " + self._return_clause(returning.upper())
+
+    def _write_result(self, cursor, returning):
+        "Return the result of an update or delete for returning"
+
+        if returning is None:
+            return cursor
 
-        aql += "\n REMOVE {_key: rec._key} IN @@collection" + options
+        if returning == "count":
+            return cursor.statistics()["modified"]
 
-        return self._db.aql.execute(aql, bind_vars=self._bind_vars)
+        return [self._load_record(rec) for rec in cursor]
+
+    def cached(self, ttl=None):
+        """
+        Serve the query's results from the database's result cache (see
+        arango_orm.cache.ResultCache), storing them there on a miss. Entries
+        expire after ttl seconds (the cache's ttl if None) or when the
+        collection is written to using the Database or Query methods.
+
+        Results are copied for each call, so modifying the loaded objects
+        doesn't change the cached results.
+        """
+        self._cache_results = True
+        self._cache_ttl = ttl
+        return self
 
     def ttl(self, nsec):
         """
@@ -245,50 +975,630 @@ class Query(object):
         self._cursor_ttl = nsec
         return self
 
-    def iterator(self):
-        "Return all records considering current filter conditions (if any)"
+    def _return_clause(self, var="rec"):
+        "Return the RETURN expression for the current projection (if any)"
+
+        if self._return_fields is None:
+            return var
+
+        tree = {}
+        for name in self._return_fields:
+            node = tree
+            parts = self._attribute_path(name).split(".")
+            for part in parts[:-1]:
+                node = node.setdefault(part, {})
+                if node is None:
+                    # the whole value is already returned
+                    break
+            else:
+                node[parts[-1]] = None
+
+        return _keep_expression(var, tree, _SYSTEM_ATTRIBUTES)
 
-        aql = self._make_aql()
+    def _attribute_path(self, name):
+        "Return the document attribute path of a (dotted) field name"
 
-        if self._return_fields is not None:
-            aql += "\n RETURN {%s}" % ", ".join(
-                [
-                    "{0}: rec.{0}".format(f.data_key or f.name)
-                    for f in self._return_fields
-                ]
+        return _field_path(self._CollectionClass, name)
+
+    def _execute(self, return_clause, joins=True, **cursor_options):
+        """
+        Execute the query returning given expression for each record. Cursor
+        options (batch_size, stream, memory_limit) which are not None are
+        passed to aql.execute.
+
+        :param joins: Run the joinedload() subqueries, whose values the
+            _load_clause() returns.
+        """
+
+        aql, bind_vars = self._select_aql(return_clause, joins)
+        options = {k: v for k, v in cursor_options.items() if v is not None}
+
+        return self._run(aql, bind_vars, ttl=self._cursor_ttl, **options)
+
+    def _run(self, aql, bind_vars=None, **options):
+        """
+        Execute aql with the query's bind variables (or the given ones). The
+        results of cached() queries are returned from the database's result
+        cache if present, or fetched and stored there.
+        """
+
+        if bind_vars is None:
+            bind_vars = self._bind_vars
+
+        cache = self._result_cache(options)
+        if cache is None:
+            return self._db.aql.execute(aql, bind_vars=bind_vars, **options)
+
+        key = self._result_key(aql, bind_vars, options)
+        entry = cache.get(key)
+        if entry is None:
+            collections = self._result_collections(bind_vars)
+            generation = cache.generation(collections)
+            cursor = self._db.aql.execute(aql, bind_vars=bind_vars, **options)
+            entry = (list(cursor), cursor.statistics())
+            cache.put(
+                key, entry, collections, ttl=self._cache_ttl, generation=generation
             )
-        else:
-            aql += "\n RETURN rec"
-        # print(aql)
 
-        results = self._db.aql.execute(
-            aql, bind_vars=self._bind_vars, ttl=self._cursor_ttl
+        rows, stats = entry
+        return _CachedResult(copy.deepcopy(rows), stats)
+
+    def _result_cache(self, options):
+        "Return the result cache used for the query run with options, if any"
+
+        cache = getattr(self._db, "result_cache", None)
+        if not self._cache_results or "profile" in options:
+            return None
+
+        return cache
+
+    def _result_key(self, aql, bind_vars, options):
+        "Return the result cache key of aql run with bind_vars and options"
+
+        return (
+            aql,
+            json.dumps(bind_vars, sort_keys=True, default=str),
+            tuple(sorted(
+                (k, v) for k, v in options.items() if k not in _CURSOR_OPTIONS
+            )),
         )
 
+    def iterator(
+        self,
+        lazy=False,
+        batch_size=None,
+        stream=None,
+        memory_limit=None,
+        prefetch=False,
+    ):
+        """
+        Return all records considering current filter conditions (if any)
+
+        :param lazy: Yield lazy documents which deserialize each field from
+            the raw cursor document on first access instead of loading all
+            fields upfront.
+        :param batch_size: Number of documents the server returns per batch.
+        :param stream: Use a streaming cursor, computing results on the server
+            as they are fetched instead of upfront.
+        :param memory_limit: Maximum memory (bytes) the query may use on the
+            server.
+        :param prefetch: Fetch the next batch in a background thread while the
+            current one is being loaded.
+        """
+
+        results = self._execute(
+            self._load_clause(),
+            batch_size=batch_size,
+            stream=stream,
+            memory_limit=memory_limit,
+        )
+
+        if prefetch and not isinstance(results, _CachedResult):
+            results = _BatchPrefetcher(results)
+
         for rec in results:
-            only = (
-                [f.name for f in self._return_fields]
-                if self._return_fields
-                else None
+            yield self._load_record(rec, lazy=lazy)
+
+    def parallel_iter(
+        self,
+        partitions=None,
+        workers=None,
+        dbs=None,
+        lazy=False,
+        batch_size=None,
+        transform=None,
+        process_pool=None,
+    ):
+        """
+        Return all records matching the query, scanning partitions of the
+        collection's key space concurrently. Records are yielded in the order
+        they arrive, so the query can't be sorted or limited.
+
+        :param partitions: Number of key ranges to scan, by default the number
+            of shards in a cluster or else 4.
+        :param workers: Number of threads running the partition queries, by
+            default one per partition.
+        :param dbs: Databases to run the partition queries on in round robin
+            fashion (e.g. the pool of a ConnectionPool), by default the
+            query's database.
+        :param lazy: Yield lazy documents, see iterator().
+        :param batch_size: Number of documents the server returns per batch.
+        :param transform: Function applied to each raw document, yielding its
+            results instead of collection objects.
+        :param process_pool: concurrent.futures executor running transform on
+            the batches of documents (transform must be picklable for a
+            ProcessPoolExecutor).
+        """
+
+        if self._sort_columns or self._limit:
+            raise ValueError("parallel_iter() can't be used with sort() or limit()")
+
+        if process_pool is not None and transform is None:
+            raise ValueError("process_pool requires a transform")
+
+        if partitions is None:
+            partitions = self._shard_count() or 4
+
+        queries = self._partition_queries(self._key_ranges(partitions), dbs or [self._db])
+        batches = _PartitionScanner(
+            queries,
+            self._return_clause() if transform else self._load_clause(),
+            workers or len(queries),
+            batch_size=batch_size,
+            joins=transform is None,
+        )
+
+        if process_pool is not None:
+            pending = deque()
+            for records in batches:
+                pending.append(process_pool.submit(_transform_batch, transform, records))
+                while pending and pending[0].done():
+                    for result in pending.popleft().result():
+                        yield result
+
+            while pending:
+                for result in pending.popleft().result():
+                    yield result
+
+            return
+
+        for records in batches:
+            for rec in records:
+                if transform is not None:
+                    yield transform(rec)
+                else:
+                    yield self._load_record(rec, lazy=lazy)
+
+    def _shard_count(self):
+        "Return the number of shards of the collection, None if not in a cluster"
+
+        collection = self._db.collection(self._CollectionClass.__collection__)
+        try:
+            return len(collection.shards().get("shards") or {}) or None
+        except CollectionShardsError:
+            return None
+
+    def _partition_queries(self, key_ranges, dbs):
+        "Return copies of this query limited to the (low, high) key ranges"
+
+        queries = []
+        for idx, (lo, hi) in enumerate(key_ranges):
+            conditions = []
+            query = self._clone()
+            query._db = dbs[idx % len(dbs)]
+            query._cache_results = False
+            if lo is not None:
+                conditions.append("rec._key >= @_part_lo")
+                query._bind_vars["_part_lo"] = lo
+            if hi is not None:
+                conditions.append("rec._key < @_part_hi")
+                query._bind_vars["_part_hi"] = hi
+
+            if conditions:
+                # a separate FILTER, so OR joined conditions are kept intact
+                query._filter_conditions.insert(
+                    0,
+                    dict(
+                        condition=" AND ".join(conditions),
+                        joiner=None,
+                        prepend_rec_name=False,
+                        rec_name_placeholder=None,
+                    ),
+                )
+                if len(query._filter_conditions) > 1:
+                    query._filter_conditions[1] = dict(
+                        query._filter_conditions[1], joiner=None
+                    )
+
+            queries.append(query)
+
+        return queries
+
+    def _key_ranges(self, partitions):
+        """
+        Return (low, high) _key bounds (None for unbounded) splitting the
+        collection into partitions ranges of about the same number of documents.
+        """
+
+        collection = self._CollectionClass.__collection__
+        total = self._db.collection(collection).count()
+
+        bounds = []
+        for bind_vars in _key_bound_vars(collection, total, partitions):
+            bounds.extend(self._db.aql.execute(_KEY_BOUND_AQL, bind_vars=bind_vars))
+
+        return _ranges_between(bounds)
+
+    def _only_fields(self):
+        "Return names of the fields selected using returns() or None"
+
+        if not self._return_fields:
+            return None
+
+        return self._return_fields
+
+    def _load_record(self, rec, lazy=False):
+        """
+        Create a collection object from a document returned by the query, or
+        from a [document, joined values...] array (see _load_clause()).
+        """
+
+        joined = None
+        if isinstance(rec, list):
+            rec, joined = rec[0], rec[1:]
+
+        if lazy:
+            obj = self._CollectionClass._load_lazy(
+                rec, only=self._only_fields(), db=self._db
+            )
+        else:
+            obj = self._CollectionClass._load(
+                rec, only=self._only_fields(), db=self._db, from_db=True
             )
-            yield self._CollectionClass._load(rec, only=only, db=self._db)
+
+        if joined:
+            self._set_joined(obj, joined)
+
+        return obj
+
+    def dicts(self):
+        """
+        Return all records as raw document dicts, without creating collection
+        objects. Fields selected using returns() are honored.
+        """
+
+        for rec in self._execute(self._return_clause(), joins=False):
+            yield rec
+
+    def tuples(self, *fields):
+        """
+        Return all records as tuples of the given field values, without creating
+        collection objects. If no fields are given, fields selected using
+        returns() are used.
+        """
+
+        fields = self._tuple_fields(fields)
+        for rec in self._execute(self._array_clause(fields), joins=False):
+            yield tuple(rec)
+
+    def _tuple_fields(self, fields):
+        "Return the fields of tuples(), defaulting to the returns() projection"
+
+        if not fields:
+            if self._return_fields is None:
+                raise ValueError("tuples() requires fields or a returns() projection")
+
+            fields = list(self._return_fields)
+
+        return fields
+
+    def _array_clause(self, fields):
+        "Return AQL array expression of given fields' values"
+
+        return "[%s]" % ", ".join("rec." + self._attribute_path(f) for f in fields)
+
+    def to_columns(self, *fields):
+        """
+        Return the values of given fields as a dict of columns.
+
+        Values of Integer, Float/Number and Boolean fields are collected in
+        compact array.array columns, other fields (and numeric fields with
+        values not fitting the array type) in lists of raw values. Float None
+        values are stored as NaN. If no fields are given, fields selected using
+        returns() or else all collection fields are used.
+        """
+
+        fields = self._column_fields(fields)
+
+        return self._fill_columns(
+            fields, self._execute(self._array_clause(fields), joins=False)
+        )
+
+    def _column_fields(self, fields):
+        "Return the fields of to_columns(), see its documentation"
+
+        if not fields:
+            if self._return_fields is not None:
+                fields = list(self._return_fields)
+            else:
+                fields = list(self._CollectionClass.get_objects_dict())
+
+        return fields
+
+    def _fill_columns(self, fields, rows):
+        "Return dict of columns filled with the values of given rows"
+
+        col_fields = self._CollectionClass.get_objects_dict()
+        columns = []
+        appenders = []
+        nan_cols = set()
+
+        for idx, f in enumerate(fields):
+            typecode = _column_typecode(col_fields.get(f))
+            col = array(typecode) if typecode else []
+            columns.append(col)
+            appenders.append(_bool_appender(col) if typecode == "B" else col.append)
+            if typecode == "d":
+                nan_cols.add(idx)
+
+        for rec in rows:
+            for idx, value in enumerate(rec):
+                try:
+                    appenders[idx](value)
+                except (TypeError, OverflowError):
+                    if value is None and idx in nan_cols:
+                        appenders[idx](NAN)
+                        continue
+
+                    # fall back to a list column
+                    columns[idx] = _column_values(columns[idx])
+                    appenders[idx] = columns[idx].append
+                    appenders[idx](value)
+
+        return dict(zip(fields, columns))
+
+    def to_arrays(self, *fields):
+        """
+        Return the values of given fields as a dict of numpy arrays (requires
+        numpy).
+
+        Integer, Float/Number and Boolean fields become int64, float64 and bool
+        arrays, other fields object arrays. See to_columns().
+        """
+
+        return self._columns_to_arrays(self.to_columns(*fields))
+
+    @staticmethod
+    def _columns_to_arrays(columns):
+        "Convert to_columns() columns to numpy arrays"
+
+        try:
+            import numpy as np
+        except ImportError:
+            raise ImportError("Query.to_arrays() requires numpy")
+
+        arrays = {}
+        for f, col in columns.items():
+            if isinstance(col, list):
+                arrays[f] = np.empty(len(col), dtype=object)
+                arrays[f][:] = col
+            else:
+                arrays[f] = np.frombuffer(col, dtype=_NUMPY_DTYPES[col.typecode])
+
+        return arrays
+
+    def _clone(self):
+        "Return a copy of this query which can be modified independently"
+
+        query = copy.copy(self)
+        query._bind_vars = dict(self._bind_vars)
+        query._filter_conditions = list(self._filter_conditions)
+        query._sort_columns = list(self._sort_columns)
+        if self._return_fields is not None:
+            query._return_fields = list(self._return_fields)
+        if self._group_fields is not None:
+            query._group_fields = list(self._group_fields)
+        query._joins = list(self._joins)
+
+        return query
+
+    def paginate(self, page_size, by=None, token=None):
+        """
+        Return a Page of up to page_size records using keyset (seek) pagination.
+
+        Records are sorted by the fields in by ("field" or "field DESC"), which
+        should end with a unique field. Pass the next_token of a page to get
+        the following page; it filters on the last record's sort values instead
+        of skipping the preceding records, so every page costs the same as the
+        first one. by defaults to the query's sort columns followed by _key.
+        """
+
+        query, clause, by = self._page_query(page_size, by, token)
+
+        return self._make_page(list(query._execute(clause)), page_size, by)
+
+    def _page_query(self, page_size, by, token):
+        """
+        Return the query fetching a page for paginate(), its RETURN expression
+        and sort columns
+        """
+
+        if self._limit:
+            raise ValueError("paginate() can't be combined with limit()")
+
+        if by is None:
+            by = list(self._sort_columns)
+            if "_key" not in [sc.split()[0] for sc in by]:
+                by.append("_key")
+
+        elif self._sort_columns and self._sort_columns != list(by):
+            raise ValueError("paginate() sort columns differ from the query's sort()")
+
+        by = list(by)
+        keys = []
+        for sc in by:
+            parts = sc.split()
+            desc = len(parts) > 1 and parts[1].upper() == "DESC"
+            keys.append(("rec." + parts[0], "<" if desc else ">"))
+
+        query = self._clone()
+        query._sort_columns = by
+
+        if token is not None:
+            token_by, after = self._decode_page_token(token)
+            if token_by != by or len(after) != len(by):
+                raise ValueError("Pagination token doesn't match the sort columns")
+
+            query._filter_conditions.append(
+                dict(
+                    condition=_seek_condition(keys),
+                    joiner=None,
+                    prepend_rec_name=False,
+                    rec_name_placeholder=None,
+                )
+            )
+            for idx, value in enumerate(after):
+                query._bind_vars["_seek_%d" % idx] = value
+
+        query.limit(page_size + 1)
+        clause = "[[%s], %s]" % (", ".join(k[0] for k in keys), self._load_clause())
+
+        return query, clause, by
+
+    def _make_page(self, rows, page_size, by):
+        "Return Page of records from rows fetched by a _page_query() query"
+
+        next_token = None
+        if len(rows) > page_size:
+            rows = rows[:page_size]
+            next_token = self._encode_page_token(by, rows[-1][0])
+
+        return Page([self._load_record(rec) for _, rec in rows], next_token)
+
+    @staticmethod
+    def _encode_page_token(by, values):
+        return base64.urlsafe_b64encode(
+            json.dumps([by, values], separators=(",", ":")).encode("utf-8")
+        ).decode("ascii")
+
+    @staticmethod
+    def _decode_page_token(token):
+        try:
+            by, values = json.loads(base64.urlsafe_b64decode(token.encode("ascii")))
+        except (ValueError, TypeError, AttributeError):
+            raise ValueError("Invalid pagination token")
+
+        return by, values
+
+    def page(self, page_num, page_size):
+        """
+        Return a Page of records (page_num starting at 1) along with the
+        total number of matching records, using a single query.
+        """
+
+        query = self._page_num_query(page_num, page_size)
+        cursor = query._execute(query._load_clause(), full_count=True)
+        records = [query._load_record(rec) for rec in cursor]
+
+        return Page(
+            records,
+            total=cursor.statistics()["fullCount"],
+            offset=query._limit_start_record,
+        )
+
+    def _page_num_query(self, page_num, page_size):
+        "Return a copy of this query limited to the given page"
+
+        if page_num < 1 or page_size < 1:
+            raise ValueError("page_num and page_size must be positive")
+
+        return self._clone().limit(page_size, (page_num - 1) * page_size)
+
+    def explain(self):
+        "Return the QueryPlan the server would use to execute the query"
+
+        aql, bind_vars = self._select_aql(self._load_clause())
+        plan = self._db.aql.explain(aql, bind_vars=bind_vars)
+
+        return QueryPlan(plan, plan.get("stats"))
+
+    def profile(self):
+        """
+        Execute the query with profiling and return its QueryPlan including the
+        runtimes of the execution nodes.
+        """
+
+        cursor = self._execute(self._load_clause(), profile=2)
+        cursor.close(ignore_missing=True)
+
+        return QueryPlan(cursor.plan(), cursor.statistics(), cursor.profile())
+
+    def advise_indexes(self, explain=False):
+        """
+        Return a list of IndexAdvice comparing the attributes the query filters
+        and sorts on with the indexes declared in the model's _index. With
+        explain=True the query's plan is checked too.
+        """
+
+        return advise_indexes(self, self.explain() if explain else None)
 
     def all(self):
         return list(self.iterator())
 
     def first(self):
-        "Return the first record that matches the query"
+        "Return the first record that matches the query or None"
 
-        rec = self.limit(1).all()
-        if len(rec) > 0:
-            return rec[0]
-        else:
-            return None
+        query = self._limited(1)
+        for rec in query._execute(query._load_clause()):
+            return self._load_record(rec)
+
+        return None
 
     def one(self):
-        "Assert that only one record is present for the query and return that record"
-        assert 1 == self.count()
-        return self.first()
+        """
+        Return the only record matching the query. Raise NoResultFound if there
+        is none and MultipleResultsFound if there are more.
+        """
+
+        query = self._limited(2)
+        return self._load_one(list(query._execute(query._load_clause())))
+
+    def one_or_none(self):
+        """
+        Return the only record matching the query or None. Raise
+        MultipleResultsFound if there are more.
+        """
+
+        query = self._limited(2)
+        return self._load_one(
+            list(query._execute(query._load_clause())), required=False
+        )
+
+    def _limited(self, num_records):
+        "Return a copy of this query returning at most num_records records"
+
+        query = self._clone()
+        if query._limit:
+            num_records = min(num_records, query._limit)
+
+        return query.limit(num_records, query._limit_start_record)
+
+    def _load_one(self, rows, required=True):
+        "Load the only row of rows returned by a _limited(2) query"
+
+        if len(rows) > 1:
+            raise MultipleResultsFound(
+                "Multiple records found in %s" % self._CollectionClass.__collection__
+            )
+
+        if not rows:
+            if required:
+                raise NoResultFound(
+                    "No record found in %s" % self._CollectionClass.__collection__
+                )
+            return None
+
+        return self._load_record(rows[0])
 
     def aql(self, query, **kwargs):
         """
@@ -306,6 +1616,6 @@ class Query(object):
             }
 
         return [
-            self._CollectionClass._load(rec, db=self._db)
+            self._CollectionClass._load(rec, db=self._db, from_db=True)
             for rec in self._db.aql.execute(query, **kwargs)
         ]
@@ -0,0 +1,48 @@
+"""
+Testing Module
+--------------
+
+Helpers for test suites of applications using arango_orm, running against a
+database server.
+"""
+
+
+def assert_uses_index(query, fields=None):
+    """
+    Assert that the query's execution plan uses an index, or an index whose
+    leading fields are the given fields. Return the QueryPlan.
+    """
+
+    plan = query.explain()
+    if not plan.uses_index(fields):
+        used = [index.get("fields") for index in plan.indexes]
+        raise AssertionError(
+            "Query on %s does not use an index%s (indexes used: %s)\n%s"
+            % (
+                query._CollectionClass.__collection__,
+                "" if fields is None else " on %s" % ", ".join(fields),
+                used or "none",
+                query._make_aql("\n RETURN " + query._return_clause()),
+            )
+        )
+
+    return plan
+
+
+def assert_no_full_scan(query):
+    """
+    Assert that the query's execution plan doesn't read all documents of a
+    collection. Return the QueryPlan.
+    """
+
+    plan = query.explain()
+    if plan.collection_scans:
+        raise AssertionError(
+            "Query reads all documents of %s\n%s"
+            % (
+                ", ".join(n.get("collection", "?") for n in plan.collection_scans),
+                query._make_aql("\n RETURN " + query._return_clause()),
+            )
+        )
+
+    return plan
@@ -0,0 +1,78 @@
+"""
+Attribute access micro benchmark.
+
+Compares reading fields, assigning fields and dumping objects of a model using
+the descriptors installed by CollectionMeta with the same model using the
+Collection.__getattribute__ override arango_orm used previously.
+
+Run from the repository root::
+
+    python benchmarks/bench_attribute_access.py
+"""
+
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from arango_orm import Collection  # noqa: E402
+from arango_orm.fields import String, Integer, Boolean  # noqa: E402
+
+
+class Student(Collection):
+    __collection__ = "students"
+
+    _key = String(required=True)
+    name = String(required=True)
+    age = Integer(allow_none=True)
+    city = String(allow_none=True)
+    active = Boolean(default=True)
+
+
+class LegacyStudent(Student):
+    "Student with the former __getattribute__ based relationship/_key_field lookup."
+
+    def __getattribute__(self, item):
+        get = super(Collection, self).__getattribute__
+        if item not in get("_refs"):
+            if item == get("_key_field"):
+                return get("_key")
+            return get(item)
+
+        return get("_refs_vals")[item]
+
+
+def run(model, number):
+    obj = model(_key="S1001", name="John Wayne", age=30, city="Gotham")
+
+    def read_fields():
+        return (obj.name, obj.age, obj.city, obj.active, obj._key)
+
+    def set_fields():
+        obj.age = 31
+        obj.city = "Metropolis"
+
+    return {
+        "read 5 fields": timeit.timeit(read_fields, number=number),
+        "set 2 fields": timeit.timeit(set_fields, number=number),
+        "_dump()": timeit.timeit(obj._dump, number=number // 10),
+    }
+
+
+def main():
+    number = int(os.environ.get("BENCH_NUMBER", 200000))
+
+    legacy = run(LegacyStudent, number)
+    current = run(Student, number)
+
+    print("%-16s %12s %12s %8s" % ("operation", "legacy (s)", "current (s)", "speedup"))
+    for op, legacy_time in legacy.items():
+        print(
+            "%-16s %12.4f %12.4f %7.2fx"
+            % (op, legacy_time, current[op], legacy_time / current[op])
+        )
+
+
+if __name__ == "__main__":
+    main()
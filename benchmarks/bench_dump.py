@@ -0,0 +1,82 @@
+"""
+Benchmark of Collection._dump for the different validation policies.
+
+"marshmallow" is the former implementation: schema.dump() followed by
+schema.validate() on the dumped data.
+
+Run from the repository root::
+
+    python benchmarks/bench_dump.py
+"""
+
+import os
+import sys
+import timeit
+from datetime import date
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from arango_orm import Collection  # noqa: E402
+from arango_orm.fields import String, Integer, Float, Boolean, Date, List  # noqa: E402
+
+
+class Student(Collection):
+    __collection__ = "students"
+
+    _key = String(required=True)
+    name = String(required=True)
+    age = Integer(allow_none=True)
+    gpa = Float(allow_none=True)
+    active = Boolean(default=True)
+    dob = Date(allow_none=True)
+    subjects = List(String())
+
+
+def make_student():
+    student = Student._load(
+        {
+            "_key": "S1001",
+            "name": "John Wayne",
+            "age": 30,
+            "gpa": 3.4,
+            "active": True,
+            "dob": "1990-05-17",
+            "subjects": ["ITP101", "CS102"],
+        },
+        db=object(),
+    )
+    student.dob = date(1990, 5, 18)
+
+    return student
+
+
+def marshmallow_dump(obj):
+    schema = obj.schema()
+    data = schema.dump(obj)
+    schema.validate(data)
+
+    return data
+
+
+def main():
+    number = int(os.environ.get("BENCH_NUMBER", 20000))
+    student = make_student()
+
+    timings = {"marshmallow": timeit.timeit(lambda: marshmallow_dump(student), number=number)}
+    for policy in ("always", "first_write", "never"):
+        Student._dump_validation = policy
+        timings[policy] = timeit.timeit(student._dump, number=number)
+
+    Student._dump_validation = "always"
+    timings["only dirty"] = timeit.timeit(
+        lambda: student._dump(only=student._dirty), number=number
+    )
+
+    base = timings["marshmallow"]
+    print("%-14s %10s %8s" % ("dump", "time (s)", "speedup"))
+    for name, elapsed in timings.items():
+        print("%-14s %10.4f %7.2fx" % (name, elapsed, base / elapsed))
+
+
+if __name__ == "__main__":
+    main()
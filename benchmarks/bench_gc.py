@@ -0,0 +1,109 @@
+"""
+GC / throughput benchmark of loading and discarding documents.
+
+Loads BENCH_NUMBER (default 1,000,000) documents as they are read from the
+database and drops each object right away, once with the model as it is and
+once with the per instance __del__ finalizer Collection had before. Reports the
+elapsed time and the time spent in cyclic garbage collection.
+
+Run from the repository root::
+
+    python benchmarks/bench_gc.py
+"""
+
+import gc
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from arango_orm import Collection  # noqa: E402
+from arango_orm.fields import String, Integer, Boolean, List  # noqa: E402
+
+
+class Student(Collection):
+    __collection__ = "students"
+    _trusted_load = True
+
+    _key = String(required=True)
+    name = String(required=True)
+    age = Integer(allow_none=True)
+    active = Boolean(default=True)
+    subjects = List(String())
+
+
+class FinalizedStudent(Student):
+    "Student with the former Collection.__del__ finalizer."
+
+    def __del__(self):
+        for parm, field in self._fields.items():
+            if hasattr(field, 'parent'):
+                field.parent = None
+            if hasattr(field, 'root'):
+                field.root = None
+
+        self._dirty = None
+
+
+class GCTimer(object):
+    "Sums the duration of the garbage collections using gc.callbacks."
+
+    def __init__(self):
+        self.elapsed = 0.0
+        self.collections = 0
+        self._start = None
+
+    def __call__(self, phase, info):
+        if phase == "start":
+            self._start = time.perf_counter()
+        else:
+            self.elapsed += time.perf_counter() - self._start
+            self.collections += 1
+
+
+def documents(num):
+    return [
+        {
+            "_key": "S%d" % i,
+            "_id": "students/S%d" % i,
+            "name": "Student %d" % i,
+            "age": 18 + i % 10,
+            "active": bool(i % 2),
+            "subjects": ["ITP101", "CS102"],
+        }
+        for i in range(num)
+    ]
+
+
+def run(model, docs, number, db):
+    gc.collect()
+    timer = GCTimer()
+    gc.callbacks.append(timer)
+
+    start = time.perf_counter()
+    for i in range(number):
+        obj = model._load(docs[i % len(docs)], db=db, from_db=True)
+        # keep a reference cycle per object as relationship caches do
+        obj._refs_vals["self"] = obj
+        del obj
+
+    gc.collect()
+    elapsed = time.perf_counter() - start
+    gc.callbacks.remove(timer)
+
+    return elapsed, timer.elapsed, timer.collections
+
+
+def main():
+    number = int(os.environ.get("BENCH_NUMBER", 1000000))
+    docs = documents(1000)
+    db = object()
+
+    print("%-18s %10s %10s %12s" % ("model", "total (s)", "gc (s)", "collections"))
+    for model in (FinalizedStudent, Student):
+        print("%-18s %10.3f %10.3f %12d" % ((model.__name__,) + run(model, docs, number, db)))
+
+
+if __name__ == "__main__":
+    main()
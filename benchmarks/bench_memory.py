@@ -0,0 +1,102 @@
+"""
+Memory benchmark for the regular (__dict__) and compact (__slots__) layouts.
+
+Both layouts are generated from the models in tests/data.py and the same
+documents are loaded into each of them, as they would be when read from the
+database. Only the memory still used by the objects once the documents are
+freed is counted.
+
+Run from the repository root::
+
+    python benchmarks/bench_memory.py
+"""
+
+import gc
+import json
+import os
+import sys
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from arango_orm import Collection, Relation  # noqa: E402
+from arango_orm.collections import CollectionMeta  # noqa: E402
+from tests.data import Person, Car, Student, SpecializesIn  # noqa: E402
+
+
+def make_model(model, compact):
+    "Create a copy of the model class using the given layout."
+    attrs = dict(model.get_objects_dict())
+    attrs.update(
+        __collection__=model.__collection__,
+        _key_field=model._key_field,
+        _allow_extra_fields=model._allow_extra_fields,
+        _compact=compact,
+    )
+    base = Relation if issubclass(model, Relation) else Collection
+
+    return CollectionMeta(model.__name__, (base,), attrs)
+
+
+def documents(model, num):
+    "Generate num documents of the given model as returned by arangodb."
+    col = model.__collection__
+    for i in range(num):
+        doc = {"_key": str(i), "_id": "%s/%d" % (col, i), "_rev": "_fxd%d" % i}
+
+        if model is Person:
+            doc.update(name="Person %d" % i, age=i % 90, dob="2016-09-12", is_staff=False)
+        elif model is Car:
+            doc.update(make="Honda", model="Civic", year=1980 + i % 40, owner_key=str(i))
+        elif model is Student:
+            doc.update(name="Student %d" % i, age=i % 30)
+        elif model is SpecializesIn:
+            doc.update(
+                _from="teachers/%d" % i, _to="subjects/%d" % i, expertise_level="medium"
+            )
+
+        yield doc
+
+
+def measure(model, source, num):
+    """
+    Return bytes allocated per loaded object, the documents they are loaded
+    from are freed before measuring.
+    """
+    db = object()  # objects are loaded as coming from the database
+    gc.collect()
+    tracemalloc.start()
+    start = tracemalloc.take_snapshot()
+
+    docs = list(documents(source, num))
+    objs = [model._load(doc, db=db, from_db=True) for doc in docs]
+    del docs
+    gc.collect()
+
+    used = sum(
+        stat.size_diff
+        for stat in tracemalloc.take_snapshot().compare_to(start, "filename")
+    )
+    tracemalloc.stop()
+
+    return used / len(objs)
+
+
+def main():
+    num = int(os.environ.get("BENCH_NUMBER", 50000))
+
+    print("%-14s %10s %12s %12s %8s" % ("model", "json (B)", "regular (B)", "compact (B)", "saving"))
+    for model in (Person, Car, Student, SpecializesIn):
+        json_size = sum(len(json.dumps(d)) for d in documents(model, num)) / num
+
+        regular = measure(make_model(model, compact=False), model, num)
+        compact = measure(make_model(model, compact=True), model, num)
+
+        print(
+            "%-14s %10.0f %12.0f %12.0f %7.0f%%"
+            % (model.__name__, json_size, regular, compact, 100 * (1 - compact / regular))
+        )
+
+
+if __name__ == "__main__":
+    main()
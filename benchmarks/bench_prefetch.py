@@ -0,0 +1,108 @@
+"""
+Benchmark of Query.iterator() with and without background batch prefetching.
+
+The database is simulated by a cursor which sleeps BENCH_LATENCY seconds
+(default 0.02) for every batch it fetches, so the time spent loading objects
+can overlap with the simulated network round trips when prefetching.
+
+Run from the repository root::
+
+    python benchmarks/bench_prefetch.py
+"""
+
+import os
+import sys
+import time
+from collections import deque
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from arango_orm import Collection  # noqa: E402
+from arango_orm.query import Query  # noqa: E402
+from arango_orm.fields import String, Integer, Date  # noqa: E402
+
+
+class Student(Collection):
+    __collection__ = "students"
+
+    _key = String(required=True)
+    name = String(required=True)
+    age = Integer(allow_none=True)
+    dob = Date(allow_none=True)
+
+
+class SlowCursor(object):
+    "Cursor returning batches of batch_size documents with a delay per fetch."
+
+    def __init__(self, docs, batch_size, latency):
+        self._batches = [
+            docs[i:i + batch_size] for i in range(0, len(docs), batch_size)
+        ]
+        self._latency = latency
+        self._batch = deque(self._batches.pop(0))
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        if not self._batch and self._batches:
+            self.fetch()
+        if not self._batch:
+            raise StopIteration
+        return self._batch.popleft()
+
+    def batch(self):
+        return self._batch
+
+    def has_more(self):
+        return bool(self._batches)
+
+    def fetch(self):
+        time.sleep(self._latency)
+        self._batch.extend(self._batches.pop(0))
+
+    def close(self, ignore_missing=False):
+        return True
+
+
+class SlowAQL(object):
+    def __init__(self, docs, latency):
+        self.docs = docs
+        self.latency = latency
+
+    def execute(self, query, batch_size=1000, **kwargs):
+        return SlowCursor(self.docs, batch_size, self.latency)
+
+
+class SlowDatabase(object):
+    def __init__(self, docs, latency):
+        self.aql = SlowAQL(docs, latency)
+
+
+def main():
+    number = int(os.environ.get("BENCH_NUMBER", 50000))
+    latency = float(os.environ.get("BENCH_LATENCY", 0.02))
+    batch_size = 1000
+
+    docs = [
+        {
+            "_key": "S%d" % i,
+            "_id": "students/S%d" % i,
+            "name": "Student %d" % i,
+            "age": 18 + i % 10,
+            "dob": "2000-01-%02d" % (1 + i % 28),
+        }
+        for i in range(number)
+    ]
+    db = SlowDatabase(docs, latency)
+
+    print("%-12s %10s" % ("prefetch", "time (s)"))
+    for prefetch in (False, True):
+        start = time.perf_counter()
+        for _ in Query(Student, db).iterator(batch_size=batch_size, prefetch=prefetch):
+            pass
+        print("%-12s %10.3f" % (prefetch, time.perf_counter() - start))
+
+
+if __name__ == "__main__":
+    main()
@@ -17,4 +17,5 @@ setup(
     keywords="arangodb orm python",
     packages=find_packages(),
     install_requires=requires,
+    extras_require={"numpy": ["numpy"]},
 )
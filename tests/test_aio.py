@@ -0,0 +1,405 @@
+"Test cases for :module:`arango_orm.aio` against a local stub HTTP server"
+
+import asyncio
+import json
+import unittest
+
+from arango_orm.aggregates import count_
+from arango_orm.aio import AsyncDatabase, AsyncQuery
+from arango_orm.cache import ResultCache
+from arango_orm.exceptions import DocumentNotFoundError, MultipleResultsFound, RequestError
+from arango_orm.query import joinedload
+
+from .data import Person
+
+PEOPLE = [
+    {"_key": "1", "_id": "persons/1", "name": "Alice", "dob": "1990-01-01"},
+    {"_key": "2", "_id": "persons/2", "name": "Bob", "dob": "1991-02-02"},
+    {"_key": "3", "_id": "persons/3", "name": "Carol", "dob": "1992-03-03"},
+]
+
+
+class StubServer(object):
+    "Emulates the few ArangoDB endpoints used by the tests"
+
+    def __init__(self):
+        self.requests = []
+        self.connections = 0
+        # "idle": close the connection after the next response, "drop": close
+        # it after reading the next request without responding
+        self.close_next = None
+        # answer the next request with a HTML error page
+        self.error_page = False
+        self.docs = {doc["_key"]: dict(doc) for doc in PEOPLE}
+        self._server = None
+
+    async def start(self):
+        self._server = await asyncio.start_server(self._handle, "127.0.0.1", 0)
+        return "http://127.0.0.1:%d" % self._server.sockets[0].getsockname()[1]
+
+    async def stop(self):
+        self._server.close()
+        await self._server.wait_closed()
+
+    async def _handle(self, reader, writer):
+        self.connections += 1
+        while True:
+            line = await reader.readline()
+            if not line:
+                break
+
+            method, path, _ = line.decode().split(" ")
+            length = 0
+            while True:
+                header = await reader.readline()
+                if header == b"\r\n":
+                    break
+                name, _, value = header.decode().partition(":")
+                if name.lower() == "content-length":
+                    length = int(value)
+
+            body = await reader.readexactly(length) if length else b""
+            data = json.loads(body) if body else None
+            self.requests.append((method, path, data))
+
+            close, self.close_next = self.close_next, None
+            if close == "drop":
+                break
+
+            status, result = self._respond(method, path.split("?")[0], data)
+            payload = b"" if result is None else json.dumps(result).encode()
+            if self.error_page:
+                self.error_page = False
+                status, payload = 502, b"<html><body>Bad Gateway</body></html>"
+
+            writer.write(
+                b"HTTP/1.1 %d OK\r\nContent-Type: application/json\r\n"
+                b"Content-Length: %d\r\n\r\n" % (status, len(payload))
+            )
+            if method != "HEAD":
+                writer.write(payload)
+            await writer.drain()
+
+            if close == "idle":
+                break
+
+        writer.close()
+
+    def _respond(self, method, path, data):
+        assert path.startswith("/_db/test/")
+        path = path[len("/_db/test"):]
+
+        if path == "/_api/cursor" and method == "POST":
+            if "COUNT INTO" in data["query"]:
+                return 201, {"result": [len(self.docs)], "hasMore": False}
+
+            if " AGGREGATE " in data["query"]:
+                return 201, {"result": [{"n": len(self.docs)}], "hasMore": False}
+
+            bind_vars = data.get("bindVars", {})
+            if "_keys" in bind_vars:
+                rows = [self.docs.get(key) for key in bind_vars["_keys"]]
+                return 201, {"result": rows, "hasMore": False}
+
+            if "UPDATE" in data["query"]:
+                rows = list(self.docs.values()) if "RETURN NEW" in data["query"] else []
+                return 201, {
+                    "result": rows,
+                    "hasMore": False,
+                    "extra": {"stats": {"writesExecuted": len(self.docs)}},
+                }
+
+            if "_offset" in bind_vars:
+                return 201, {"result": sorted(self.docs)[bind_vars["_offset"]:][:1], "hasMore": False}
+
+            rows = [
+                doc for key, doc in self.docs.items()
+                if bind_vars.get("_part_lo", key) <= key
+                and ("_part_hi" not in bind_vars or key < bind_vars["_part_hi"])
+            ]
+            total = len(rows)
+            if "_limit_count" in bind_vars:
+                offset = bind_vars["_limit_offset"]
+                rows = rows[offset:offset + bind_vars["_limit_count"]]
+
+            size = data.get("batchSize", 1000)
+            return 201, {
+                "id": "42",
+                "result": rows[:size],
+                "hasMore": len(rows) > size,
+                "extra": {"stats": {"writesExecuted": 0, "fullCount": total}},
+            }
+
+        if path == "/_api/cursor/42" and method == "PUT":
+            return 200, {"id": "42", "result": list(self.docs.values())[1:], "hasMore": False}
+
+        if path == "/_api/collection/persons/count":
+            return 200, {"count": len(self.docs)}
+
+        if path.startswith("/_api/document/persons"):
+            key = path.rpartition("/")[2]
+            if method == "POST":
+                data["_key"] = data.get("_key") or str(len(self.docs) + 1)
+                self.docs[data["_key"]] = data
+                return 202, {"_key": data["_key"], "_id": "persons/" + data["_key"]}
+
+            if key not in self.docs:
+                return 404, {"error": True, "errorNum": 1202, "errorMessage": "document not found"}
+
+            if method == "PATCH":
+                self.docs[key].update(data)
+            elif method == "DELETE":
+                del self.docs[key]
+                return 202, {"_key": key}
+            elif method == "HEAD":
+                return 200, None
+
+            return 200, self.docs[key]
+
+        return 404, {"error": True, "errorNum": 404, "errorMessage": "unknown path"}
+
+
+class TestAsyncDatabase(unittest.TestCase):
+    def run_with_db(self, test):
+        async def main():
+            server = StubServer()
+            url = await server.start()
+            try:
+                async with AsyncDatabase(url, "test", max_connections=2) as db:
+                    await test(db, server)
+            finally:
+                await server.stop()
+
+        asyncio.run(main())
+
+    def test_01_query(self):
+        async def test(db, server):
+            query = db.query(Person)
+            assert isinstance(query, AsyncQuery)
+            assert 3 == await query.count()
+
+            people = await query.all()
+            assert ["Alice", "Bob", "Carol"] == [p.name for p in people]
+            assert people[0]._db is db
+
+            # batches are fetched as the cursor is consumed
+            names = [p.name async for p in db.query(Person).iterator(batch_size=1)]
+            assert ["Alice", "Bob", "Carol"] == names
+            assert "PUT" == server.requests[-1][0]
+
+            assert 3 == await db.query(Person).full_count()
+
+        self.run_with_db(test)
+
+    def test_01_01_page_and_count(self):
+        async def test(db, server):
+            # unfiltered queries use the collection count
+            assert 3 == await db.query(Person).limit(1).full_count()
+            assert "/_db/test/_api/collection/persons/count" == server.requests[-1][1]
+
+            assert 3 == await db.query(Person).filter("name != null").count()
+            assert "COUNT INTO" in server.requests[-1][2]["query"]
+
+            count = len(server.requests)
+            page = await db.query(Person).page(1, 2)
+            assert ["Alice", "Bob"] == [p.name for p in page]
+            assert 3 == page.total
+            assert page.has_next
+            assert count + 1 == len(server.requests)
+
+            page = await db.query(Person).page(2, 2)
+            assert ["Carol"] == [p.name for p in page]
+            assert not page.has_next
+
+        self.run_with_db(test)
+
+    def test_01_02_first_and_one(self):
+        async def test(db, server):
+            query = db.query(Person)
+            assert "Alice" == (await query.first()).name
+            assert 1 == server.requests[-1][2]["bindVars"]["_limit_count"]
+            assert query._limit is None
+
+            assert "Bob" == (await query.limit(1, 1).one()).name
+
+            with self.assertRaises(MultipleResultsFound):
+                await db.query(Person).one_or_none()
+            assert 2 == server.requests[-1][2]["bindVars"]["_limit_count"]
+
+        self.run_with_db(test)
+
+    def test_01_03_by_keys(self):
+        async def test(db, server):
+            people = await db.query(Person).by_keys(["3", "9", "1"], missing="none", chunk_size=2)
+            assert ["Carol", None, "Alice"] == [p and p.name for p in people]
+            assert 2 == len([r for r in server.requests if r[0] == "POST"])
+
+            # keys can be any iterable
+            people = await db.query(Person).by_keys((k for k in ["2", "9"]), missing="none")
+            assert ["Bob", None] == [p and p.name for p in people]
+
+        self.run_with_db(test)
+
+    def test_01_04_update_returning(self):
+        async def test(db, server):
+            assert 3 == await db.query(Person).update(name="X", returning="count")
+
+            people = await db.query(Person).update(name="X", returning="new")
+            assert 3 == len(people)
+            assert isinstance(people[0], Person)
+            assert server.requests[-1][2]["query"].endswith("RETURN NEW")
+
+        self.run_with_db(test)
+
+    def test_01_05_aggregate(self):
+        async def test(db, server):
+            assert [{"n": 3}] == await db.query(Person).aggregate(n=count_())
+            assert "COLLECT AGGREGATE agg0 = LENGTH(1)" in server.requests[-1][2]["query"]
+
+        self.run_with_db(test)
+
+    def test_01_06_result_cache_and_prefetch(self):
+        async def test(db, server):
+            db.result_cache = ResultCache(maxsize=8)
+            query = db.query(Person).filter("name != null").cached()
+            assert 3 == len(await query.all())
+            count = len(server.requests)
+            assert ["Alice", "Bob", "Carol"] == [p.name async for p in query.iterator(prefetch=True)]
+            assert 3 == await query.count()
+            assert count + 1 == len(server.requests)
+
+            await db.query(Person).update(name="X")
+            count = len(server.requests)
+            assert 3 == len(await query.all())
+            assert count + 1 == len(server.requests)
+
+            names = [p.name async for p in db.query(Person).iterator(batch_size=1, prefetch=True)]
+            assert ["Alice", "Bob", "Carol"] == names
+            assert "PUT" == server.requests[-1][0]
+
+        self.run_with_db(test)
+
+    def test_01_07_relationships(self):
+        async def test(db, server):
+            person = await db.query(Person).by_key("1")
+            with self.assertRaises(TypeError):
+                person.cars
+
+            # joined queries with a limit
+            assert "Alice" == (await db.query(Person).options(joinedload("cars")).first()).name
+            bind_vars = server.requests[-1][2]["bindVars"]
+            self.assertEqual(
+                {"@collection": "persons", "@_join0": "cars", "_limit_offset": 0, "_limit_count": 1},
+                bind_vars,
+            )
+
+            # cached results are invalidated by writes to the joined collections
+            db.result_cache = ResultCache(maxsize=8)
+            query = db.query(Person).options(joinedload("cars")).cached()
+            await query.all()
+            count = len(server.requests)
+            await query.all()
+            db._invalidate_results("cars")
+            await query.all()
+            assert count + 1 == len(server.requests)
+
+        self.run_with_db(test)
+
+    def test_01_08_parallel_iter(self):
+        async def test(db, server):
+            people = [p async for p in db.query(Person).parallel_iter(partitions=2)]
+            self.assertEqual(["Alice", "Bob", "Carol"], sorted(p.name for p in people))
+            assert people[0]._db is db
+            # the collection is split at the key of its second document
+            bounds = [
+                {k: v for k, v in data["bindVars"].items() if k.startswith("_part")}
+                for _, _, data in server.requests[-2:]
+            ]
+            self.assertCountEqual([{"_part_hi": "2"}, {"_part_lo": "2"}], bounds)
+
+            keys = db.query(Person).parallel_iter(workers=1, transform=lambda rec: rec["_key"])
+            self.assertEqual(["1", "2", "3"], sorted([key async for key in keys]))
+
+            with self.assertRaises(ValueError):
+                [p async for p in db.query(Person).sort("name").parallel_iter()]
+
+        self.run_with_db(test)
+
+    def test_02_documents(self):
+        async def test(db, server):
+            person = await db.query(Person).by_key("2")
+            assert "Bob" == person.name
+
+            with self.assertRaises(DocumentNotFoundError):
+                await db.query(Person).by_key("99")
+
+            assert await db.has(Person, "1")
+            assert not await db.has(Person, "99")
+
+            new_person = Person(_key="4", name="Dave")
+            await db.add(new_person)
+            assert "Dave" == server.docs["4"]["name"]
+
+            person.name = "Robert"
+            await db.update(person, only_dirty=True)
+            assert ("PATCH", "/_db/test/_api/document/persons/2", {"name": "Robert", "_key": "2"}) == server.requests[-1]
+
+            # nothing changed, no request
+            count = len(server.requests)
+            await db.update(person, only_dirty=True)
+            assert count == len(server.requests)
+
+            await db.delete(new_person)
+            assert "4" not in server.docs
+
+            # write options are named like python-arango's
+            person.name = "Bob"
+            await db.update(person, sync=True, keep_none=False)
+            self.assertEqual(
+                "/_db/test/_api/document/persons/2?waitForSync=true&keepNull=false",
+                server.requests[-1][1],
+            )
+            with self.assertRaises(TypeError):
+                await db.update(person, waitForSync=True)
+
+            # error responses that aren't JSON
+            server.error_page = True
+            with self.assertRaises(RequestError) as ctx:
+                await db.query(Person).by_key("1")
+            assert 502 == ctx.exception.http_code
+
+        self.run_with_db(test)
+
+    def test_03_concurrent_requests(self):
+        async def test(db, server):
+            results = await asyncio.gather(
+                *[db.query(Person).by_key(str(1 + i % 3)) for i in range(20)]
+            )
+            assert 20 == len(results)
+            # connections are limited and reused
+            assert server.connections <= 2
+
+        self.run_with_db(test)
+
+    def test_04_dropped_connections(self):
+        async def test(db, server):
+            # connections closed while idle are replaced
+            server.close_next = "idle"
+            await db.query(Person).by_key("1")
+            await asyncio.sleep(0.01)
+            await db.add(Person(name="Dave", _key="4"))
+            assert 1 == len([r for r in server.requests if r[0] == "POST"])
+
+            # requests with side effects are not sent again
+            server.close_next = "drop"
+            with self.assertRaises(ConnectionError):
+                await db.add(Person(name="Eve", _key="5"))
+            assert 2 == len([r for r in server.requests if r[0] == "POST"])
+
+            # reading requests are sent again on a new connection
+            await db.query(Person).by_key("1")
+            server.close_next = "drop"
+            assert "Bob" == (await db.query(Person).by_key("2")).name
+            assert ["GET", "GET"] == [r[0] for r in server.requests[-2:]]
+
+        self.run_with_db(test)
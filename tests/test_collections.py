@@ -1,13 +1,26 @@
 "Test cases for the :module:`arango_orm.database`"
 
+import gc
+import pickle
+import types
+import weakref
 from datetime import date
-from arango_orm import CollectionBase, Collection
-from arango_orm.fields import String, Integer, Dict, DateTime, Nested, List
+from arango_orm import CollectionBase, Collection, warm_up_schemas
+from arango_orm.expressions import or_
+from arango_orm.fields import String, Integer, Dict, Date, DateTime, Nested, List
+from arango_orm.exceptions import DetachedInstanceError
+from arango_orm.references import Relationship
+from arango_orm.query import Query
+from marshmallow import Schema, ValidationError
 
 from . import TestBase
 from .data import Person, Car
 
 
+class TrackedPerson(Person):
+    _track_changes = True
+
+
 class TestCollection(TestBase):
     def test_01_object_from_dict(self):
         pd = {
@@ -265,3 +278,354 @@ class TestCollection(TestBase):
 
         self.assertEqual(bmw_m3_e92.__collection__, "supercar")
         
+
+    def test_15_trusted_load(self):
+        class TrustedPerson(Person):
+            _trusted_load = True
+
+        pd = {
+            "_key": "37405-4564665-7",
+            "_id": "persons/37405-4564665-7",
+            "_rev": "_fxd1",
+            "dob": "2016-09-12",
+            "name": "Kashif Iftikhar",
+            "favorite_hobby": {"name": "Programming", "type": "Challenging"},
+        }
+        p = TrustedPerson._load(pd, db=self, from_db=True)
+
+        self.assertEqual("37405-4564665-7", p._key)
+        self.assertEqual(date(year=2016, month=9, day=12), p.dob)
+        self.assertEqual("Programming", p.favorite_hobby.name)
+        self.assertFalse(p.is_staff)
+        self.assertFalse(hasattr(p, "_rev"))
+        self.assertFalse(p._dirty)
+        self.assertEqual(Person._load(pd)._dump(), p._dump())
+
+    def test_16_trusted_load_only_and_key_field(self):
+        class TrustedCar(Collection):
+            __collection__ = "cars"
+            _key_field = "plate"
+            _trusted_load = True
+            _allow_extra_fields = True
+
+            plate = String(required=True)
+            make = String(required=True)
+            year = Integer(required=True)
+
+        cd = {"_key": "LHR-2005", "make": "Honda", "year": 2005, "color": "red"}
+        c = TrustedCar._load(cd, only=["make"], from_db=True)
+
+        self.assertEqual("LHR-2005", c.plate)
+        self.assertEqual("Honda", c.make)
+        self.assertIsNone(c.year)
+        self.assertEqual("red", c.color)
+
+    def test_17_relationship_descriptor(self):
+        car = Car(make="Honda", model="Civic", year=1984, owner_key="kashif")
+
+        with self.assertRaises(DetachedInstanceError):
+            car.owner
+
+        owner = Person(_key="kashif", name="Kashif Iftikhar")
+        car.owner = owner
+
+        assert car.owner is owner
+        assert isinstance(Car.owner, Relationship)
+        assert "owner" not in car._dump()
+
+    def test_18_compact_collection(self):
+        class CompactStudent(Collection):
+            __collection__ = "students"
+            _compact = True
+
+            _key = String(required=True)
+            name = String(required=True)
+            dob = Date(allow_none=True)
+
+        s = CompactStudent._load(
+            {"_key": "S1001", "_id": "students/S1001", "name": "John Wayne", "dob": "2016-09-12"},
+            db=self,
+        )
+
+        assert not hasattr(s, "__dict__")
+        assert s._dirty_fields is None and s._refs_cache is None
+        self.assertEqual(date(year=2016, month=9, day=12), s.dob)
+        self.assertEqual("students", s.__collection__)
+
+        s.name = "Lilly Parker"
+        self.assert_has_same_items(s._dirty, ["name"])
+        self.assertEqual(
+            {"_key": "S1001", "name": "Lilly Parker", "dob": "2016-09-12"}, s._dump()
+        )
+
+    def test_19_lazy_document(self):
+        pd = {
+            "_key": "37405-4564665-7",
+            "_id": "persons/37405-4564665-7",
+            "dob": "2016-09-12",
+            "name": "Kashif Iftikhar",
+        }
+        p = Person._load_lazy(pd, db=self)
+
+        assert isinstance(p, Person)
+        assert "dob" not in p.__dict__
+        self.assertEqual(date(year=2016, month=9, day=12), p.dob)
+        assert "dob" in p.__dict__
+        assert not p._dirty
+
+        p.name = "Wonder"
+        self.assert_has_same_items(p._dirty, ["name"])
+        self.assertEqual(dict(Person._load(pd)._dump(), name="Wonder"), p._dump())
+
+    def test_20_dump_validation_policy(self):
+        class Reading(Collection):
+            __collection__ = "readings"
+            _allow_extra_fields = True
+            _dump_validation = "first_write"
+
+            _key = String(required=True)
+            value = Integer(required=True)
+
+        r = Reading._load({"_key": "R1", "value": 5, "unit": "C"}, db=self)
+        self.assertEqual({"unit"}, r._extra_fields)
+
+        # loaded values are not validated again, only modified fields are
+        r.value = None
+        with self.assertRaises(ValidationError):
+            r._dump()
+
+        r.value = 7
+        r.sensor = "S1"
+        self.assertEqual({"_key": "R1", "value": 7, "unit": "C", "sensor": "S1"}, r._dump())
+        self.assertEqual({"_key": "R1", "value": 7}, r._dump(only=r._dirty))
+
+        Reading._dump_validation = "never"
+        r.value = None
+        self.assertEqual({"_key": "R1", "value": None}, r._dump(only=["value"]))
+
+    def test_21_snapshot_dirty_tracking(self):
+        pd = {
+            "_key": "37405-4564665-7",
+            "dob": "2016-09-12",
+            "name": "Kashif Iftikhar",
+            "hobby": [{"name": "Programming", "type": "Challenging"}],
+        }
+        p = TrackedPerson._load(pd, db=self)
+
+        # assigning the loaded value doesn't make the object dirty
+        p.name = "Kashif Iftikhar"
+        assert not p._dirty
+
+        p.name = "Azeen"
+        p.name = "Kashif Iftikhar"
+        p.hobby[0].type = "Fun"
+        self.assert_has_same_items(p._update_dirty(), ["hobby"])
+        self.assertEqual(
+            {"_key": "37405-4564665-7", "hobby": [{"name": "Programming", "type": "Fun", "equipment": None}]},
+            p._dump(only=p._dirty),
+        )
+
+        p._mark_saved(p._dump(only=p._dirty), partial=True)
+        assert not p._update_dirty()
+        self.assertEqual("Challenging", pd["hobby"][0]["type"])
+
+    def test_22_schema_cache(self):
+        class Rental(Collection):
+            __collection__ = "rentals"
+            _trusted_load = True
+            _schema_cache_size = 2
+            _schema_projections = [("car", "days")]
+
+            _key = String(required=True)
+            car = String()
+            days = Integer()
+            price = Integer()
+
+        warm_up_schemas([Rental])
+        schema = Rental.schema()
+        assert schema._dumper is not None
+        assert "_trusted_decoder" in Rental.__dict__
+        assert schema is Rental.schema()
+        self.assertEqual(1, Rental.schema_cache_info().currsize)
+
+        schema = Rental.schema(["days", "car"])
+        self.assertEqual({"car", "days"}, set(schema.dump_fields))
+        assert schema is Rental.schema(("car", "days"))
+        assert schema is Rental.schema({"car", "days"})
+
+        Rental.schema(["price"])
+        Rental.schema(["car"])
+        info = Rental.schema_cache_info()
+        self.assertEqual((3, 3, 1, 2), (info.hits, info.misses, info.evictions, info.currsize))
+        assert schema is not Rental.schema(["car", "days"])
+
+    def test_23_unused_classes_are_collected(self):
+        class Temporary(Collection):
+            __collection__ = "temporary"
+
+            _key = String(required=True)
+            name = String()
+
+        t = Temporary._load({"_key": "T1", "name": "test"}, db=self)
+        self.assertEqual({"_key": "T1", "name": "test"}, t._dump())
+
+        class_ref = weakref.ref(Temporary)
+        schema_ref = weakref.ref(Temporary.schema())
+        del t, Temporary
+        # marshmallow keeps the last used schemas in an lru_cache
+        Schema._has_processors.cache_clear()
+        gc.collect()
+
+        assert class_ref() is None
+        assert schema_ref() is None
+
+    def test_23_01_nested_schema_keeps_class(self):
+        def make_address():
+            class Address(Collection):
+                street = String(required=True)
+                city = String(required=True)
+
+            return Address.schema()
+
+        class Employee(Collection):
+            __collection__ = "employees"
+
+            _key = String(required=True)
+            address = Nested(make_address())
+
+        gc.collect()
+        e = Employee._load({"_key": "E1", "address": {"street": "Mall Road", "city": "Lahore"}})
+        assert "Lahore" == e.address.city
+
+    def test_24_partial_load_not_dumped(self):
+        class Address(Collection):
+            street = String(required=True)
+            city = String(required=True)
+
+        class Employee(Collection):
+            __collection__ = "employees"
+
+            _key = String(required=True)
+            name = String(required=True)
+            tags = List(String(), default=list)
+            address = Nested(Address.schema(), allow_none=True)
+
+        query = Query(Employee).returns("name", "address.city")
+        # the class' field objects are not modified
+        assert Employee._fields["name"].name is None
+        assert query._return_clause().startswith('MERGE(KEEP(rec, "_key", "_id"')
+
+        doc = {"_key": "E1", "name": "test", "address": {"city": "Lahore"}}
+        e = Employee._load(doc, only=query._only_fields(), db=self)
+
+        assert "Lahore" == e.address.city
+        assert frozenset(["tags", "address"]) == e._unloaded
+        self.assertEqual({"_key": "E1", "name": "test"}, e._dump())
+        assert not e._update_dirty()
+
+        e.tags = ["a"]
+        self.assertEqual({"tags"}, e._update_dirty())
+        self.assertEqual({"_key": "E1", "name": "test", "tags": ["a"]}, e._dump())
+
+    def test_26_filter_expressions(self):
+        class Address(Collection):
+            city = String(data_key="City")
+
+        class Employee(Collection):
+            __collection__ = "employees"
+
+            name = String(required=True)
+            age = Integer(data_key="years")
+            joined = Date()
+            address = Nested(Address.schema())
+
+        class CompactEmployee(Employee):
+            _compact = True
+
+        query = Query(Employee).filter(
+            (Employee.age > 18) & Employee.name.in_(["a", "b"])
+        ).filter(
+            or_(Employee.joined >= date(2020, 1, 1), Employee.address.city.like("L%")),
+            _or=True,
+        )
+        self.assertEqual(
+            "FILTER (rec.years > @_e0 AND rec.name IN @_e1) OR "
+            "(rec.joined >= @_e2 OR LIKE(rec.address.City, @_e3, false)) ",
+            query._make_aql().split("\n", 1)[1],
+        )
+        self.assertEqual(
+            {"_e0": 18, "_e1": ["a", "b"], "_e2": "2020-01-01", "_e3": "L%"},
+            {k: v for k, v in query._bind_vars.items() if k.startswith("_e")},
+        )
+
+        # compact classes' slots
+        query = Query(CompactEmployee).filter(~CompactEmployee.name.is_null())
+        assert "FILTER NOT (rec.name == null) " in query._make_aql()
+
+        e = CompactEmployee(name="test")
+        assert "test" == e.name
+        # instances use the slot descriptors directly
+        assert isinstance(CompactEmployee.__dict__["name"], types.MemberDescriptorType)
+        assert isinstance(Collection.__dict__["_key"], types.MemberDescriptorType)
+        assert "_key" == Employee._key._path[0]
+
+        with self.assertRaises(TypeError):
+            (Employee.age > 1) and (Employee.age < 5)
+
+    def test_28_lazy_document_data_key(self):
+        class Reading(Collection):
+            __collection__ = "readings"
+            _allow_extra_fields = True
+
+            _key = String(required=True)
+            value = Integer(data_key="val")
+
+        r = Reading._load_lazy({"_key": "R1", "_id": "readings/R1", "val": 5, "unit": "C"}, db=self)
+
+        self.assertEqual({"unit"}, r._extra_fields)
+        assert 5 == r.value
+        self.assertEqual({"_key": "R1", "val": 5, "unit": "C"}, r._dump())
+
+    def test_28_01_lazy_document_pickle(self):
+        car = Car._load_lazy({"_key": "C1", "_id": "cars/C1", "make": "Honda", "model": "Civic", "year": 2020, "color": "red"})
+        assert "Honda" == car.make
+
+        c = pickle.loads(pickle.dumps(car))
+        assert Car is type(c)
+        self.assertEqual(car._dump(), c._dump())
+        assert "red" == c.color
+
+    def test_29_unchanged_object_not_dirty(self):
+        pd = {
+            "_key": "37405-4564665-7",
+            "_id": "persons/37405-4564665-7",
+            "dob": "2016-09-12",
+            "name": "Kashif Iftikhar",
+            "favorite_hobby": {"name": "Chess", "type": "Board"},
+            "hobby": [{"name": "Programming", "type": "Challenging"}],
+        }
+
+        for load in (TrackedPerson._load, TrackedPerson._load_lazy):
+            p = load(pd, db=self)
+            assert not p._update_dirty()
+
+            p.hobby[0].equipment = []
+            assert {"hobby"} == p._update_dirty()
+
+        # only lists, dicts and nested objects are kept
+        p = TrackedPerson._load(dict(pd, hobby=None, favorite_hobby=None), db=self)
+        assert not p._snapshot
+        assert not p._update_dirty()
+
+        p.age = 30
+        p.age = None
+        assert not p._update_dirty()
+
+        # without _track_changes only assignments make objects dirty
+        p = Person._load(pd, db=self)
+        assert p._snapshot is None
+        p.hobby[0].equipment = []
+        assert not p._update_dirty()
+
+        p._mark_saved(p._dump())
+        assert p._snapshot is None
@@ -362,6 +362,23 @@ class TestDatabase(TestBase):
         assert fresh.name == "NB-1"
         assert fresh.age == 99
 
+    def test_20_01_only_save_changed_fields(self):
+        db = self._get_db_obj()
+
+        p_ref1 = db.query(Person).by_key("12312")
+        p_ref2 = db.query(Person).by_key("12312")
+
+        # assigning unchanged values doesn't send them
+        p_ref1.name = "NB-2"
+        p_ref2.name = p_ref2.name
+        p_ref2.age = 100
+        db.update(p_ref1)
+        db.update(p_ref2, only_dirty=True)
+
+        fresh = db.query(Person).by_key("12312")
+        assert fresh.name == "NB-2"
+        assert fresh.age == 100
+
     def test_21_bulk_create(self):
 
         db = self._get_db_obj()
@@ -421,6 +438,36 @@ class TestDatabase(TestBase):
         self.assertEqual(car2.model, car2_recall.model)
         self.assertEqual(car2.year, car2_recall.year)
 
+    def test_22_01_get_many(self):
+
+        db = self._get_db_obj()
+
+        p_ref = Person(name="test_12", age=18, dob=date(year=2016, month=9, day=12))
+        car = Car(make="Honda", model="Jazz", year=2012)
+        db.bulk_add(entity_list=[p_ref, car])
+
+        ids = [car._id, "persons/missing", p_ref._id]
+        records = db.get_many(ids, models=[Person, Car], missing="none")
+
+        assert isinstance(records[0], Car)
+        assert "Jazz" == records[0].model
+        assert records[1] is None
+        assert isinstance(records[2], Person)
+        assert "test_12" == records[2].name
+
+        records = db.get_many(ids, models=[Person, Car], only=["name", "model"])
+        assert 2 == len(records)
+        assert records[0].year is None
+        assert p_ref._key == records[1]._key
+
+        persons = db.query(Person).by_keys(["missing", p_ref._key], missing="none", chunk_size=1)
+        assert persons[0] is None
+        assert "test_12" == persons[1].name
+
+        keys = (key for key in ["missing", p_ref._key])
+        persons = db.query(Person).by_keys(keys, missing="none", chunk_size=1)
+        assert [None, "test_12"] == [p and p.name for p in persons]
+
     def test_23_bulk_update(self):
 
         db = self._get_db_obj()
@@ -1,7 +1,9 @@
 "Test cases for the :module:`arango_orm.database`"
 
 import logging
+import sys
 from datetime import date
+from unittest import mock
 from . import TestBase
 from .data import Person, Car, cars
 from arango import ArangoClient
@@ -9,7 +11,11 @@ from arango.exceptions import CollectionStatisticsError
 
 from arango_orm.database import Database
 from arango_orm.collections import Collection
-from arango_orm.query import Query
+from arango_orm.query import Query, joinedload
+from arango_orm.exceptions import MultipleResultsFound, NoResultFound
+from arango_orm.testing import assert_uses_index
+from arango_orm.cache import ResultCache
+from arango_orm.aggregates import count_, count_distinct_, max_, sum_
 
 log = logging.getLogger(__name__)
 
@@ -212,6 +218,321 @@ class TestQuery(TestBase):
         assert r0.owner_key is None
         assert r1.owner_key is None
 
+    def test_13_02_lazy_iterator(self):
+
+        db = self._get_db_obj()
+
+        records = list(db.query(Car).filter("year==@year", year=2005).iterator(lazy=True))
+
+        assert 1 == len(records)
+        assert isinstance(records[0], Car)
+        assert "Mitsubishi" == records[0].make
+        assert not records[0]._dirty
+
+        records[0].model = "Lancer Evo"
+        db.update(records[0], only_dirty=True)
+        assert "Lancer Evo" == db.query(Car).by_key(records[0]._key).model
+
+        records[0].model = "Lancer"
+        db.update(records[0])
+
+    def test_13_03_dicts_and_tuples(self):
+
+        db = self._get_db_obj()
+
+        rows = list(db.query(Car).filter("year==@year", year=2005).returns('make', 'year').dicts())
+        assert [{'make': 'Mitsubishi', 'year': 2005}] == rows
+
+        rows = list(db.query(Car).filter("year==@year", year=2005).tuples('make', 'model'))
+        assert [('Mitsubishi', 'Lancer')] == rows
+
+    def test_13_04_to_columns(self):
+
+        db = self._get_db_obj()
+
+        columns = db.query(Car).filter("make==@make", make='Honda').sort("year").to_columns('model', 'year')
+
+        assert ['Civic'] * 4 == columns['model']
+        assert [1984, 1995, 1998, 2001] == columns['year'].tolist()
+
+    def test_13_04_01_to_arrays(self):
+
+        db = self._get_db_obj()
+
+        arrays = db.query(Car).filter("make==@make", make='Honda').sort("year").to_arrays('model', 'year')
+
+        assert 'object' == arrays['model'].dtype.name
+        assert 'int64' == arrays['year'].dtype.name
+        assert [1984, 1995, 1998, 2001] == arrays['year'].tolist()
+
+        # numeric and boolean columns with other values fall back to lists
+        query = db.query(Person)
+        columns = query._fill_columns(
+            ['age', 'is_staff', 'name'],
+            [[30, True, 'a'], [None, False, 'b'], [40, None, 'c']],
+        )
+        assert [30, None, 40] == columns['age']
+        assert [True, False, None] == columns['is_staff']
+        assert all(v is None or isinstance(v, bool) for v in columns['is_staff'])
+
+        columns = query._fill_columns(['age', 'is_staff'], [[30, True], [40, False]])
+        arrays = Query._columns_to_arrays(columns)
+        assert 'int64' == arrays['age'].dtype.name
+        assert 'bool' == arrays['is_staff'].dtype.name
+        assert [True, False] == arrays['is_staff'].tolist()
+
+        arrays = Query._columns_to_arrays(query._fill_columns(['age'], [[30], [None]]))
+        assert 'object' == arrays['age'].dtype.name
+        assert [30, None] == arrays['age'].tolist()
+
+        # None values of float columns are NaN
+        query = Query(Person.Hobby.Equipment)
+        arrays = Query._columns_to_arrays(query._fill_columns(['price'], [[1.5], [None]]))
+        assert 'float64' == arrays['price'].dtype.name
+        assert 1.5 == arrays['price'][0] and arrays['price'][1] != arrays['price'][1]
+        assert [1.5, None, 'x'] == query._fill_columns(['price'], [[1.5], [None], ['x']])['price']
+
+        with mock.patch.dict(sys.modules, {'numpy': None}):
+            with self.assertRaises(ImportError):
+                Query._columns_to_arrays(columns)
+
+    def test_13_05_aql_cache(self):
+
+        db = self._get_db_obj()
+
+        q1 = db.query(Car).filter("year>=@year", year=2000).sort("year").limit(2, 1)
+        q2 = db.query(Car).filter("year>=@year", year=1990).sort("year").limit(3)
+        info = Query.aql_cache_info()
+
+        assert q1._make_aql() == q2._make_aql()
+        assert Query.aql_cache_info().hits == info.hits + 1
+
+        assert [2004, 2005] == [c.year for c in q1.all()]
+        assert [1995, 1998, 2001] == [c.year for c in q2.all()]
+
+    def test_13_06_paginate(self):
+
+        db = self._get_db_obj()
+
+        query = db.query(Car).filter("year>=@year", year=1990)
+        page = query.paginate(2, by=("year DESC", "_key"))
+        years = [c.year for c in page]
+
+        while page.has_next:
+            page = query.paginate(2, by=("year DESC", "_key"), token=page.next_token)
+            years.extend(c.year for c in page)
+
+        assert [2005, 2004, 2001, 1998, 1995] == years
+        assert 1 == len(page)
+
+    def test_13_07_streaming_iterator(self):
+
+        db = self._get_db_obj()
+
+        query = db.query(Car).sort("year")
+        records = list(query.iterator(batch_size=2, stream=True, prefetch=True))
+
+        assert [c.year for c in db.query(Car).sort("year").all()] == [c.year for c in records]
+        assert isinstance(records[0], Car)
+
+    def test_13_08_page(self):
+
+        db = self._get_db_obj()
+
+        query = db.query(Car).filter("year>=@year", year=1990).sort("year DESC")
+        page = query.page(2, 2)
+
+        assert [2001, 1998] == [c.year for c in page]
+        assert 5 == page.total
+        assert page.has_next
+        assert not query.page(3, 2).has_next
+        assert 7 == db.query(Car).count()
+
+    def test_13_09_one_and_first(self):
+
+        db = self._get_db_obj()
+
+        query = db.query(Car).filter("year>=@year", year=1990).sort("year DESC")
+        assert 2005 == query.first().year
+        # first() does not limit the query
+        assert 5 == len(query.all())
+
+        assert 2005 == query.filter("year==2005").one().year
+
+        with self.assertRaises(MultipleResultsFound):
+            db.query(Car).filter("year>=@year", year=1990).one()
+
+        with self.assertRaises(NoResultFound):
+            db.query(Car).filter("year==1800").one()
+
+        assert db.query(Car).filter("year==1800").one_or_none() is None
+
+    def test_13_10_explain_and_profile(self):
+
+        db = self._get_db_obj()
+
+        query = db.query(Person).filter("name==@name", name="Kashif")
+        plan = assert_uses_index(query, ["name"])
+        assert plan.estimated_cost is not None
+        assert [] == query.advise_indexes(explain=True)
+
+        query = db.query(Car).filter("year>=@year", year=1990).sort("year DESC")
+        kinds = [advice.kind for advice in query.advise_indexes(explain=True)]
+        assert ["missing_filter_index", "missing_sort_index", "full_scan"] == kinds
+
+        with self.assertRaises(AssertionError):
+            assert_uses_index(query)
+
+        plan = query.profile()
+        assert plan.collection_scans
+        assert plan.runtimes
+        assert plan.execution_time is not None
+
+    def test_13_11_group_by_aggregate(self):
+
+        db = self._get_db_obj()
+
+        rows = db.query(Car).group_by("make").aggregate(
+            n=count_(), latest=max_("year"), models=count_distinct_("model")
+        )
+        assert [
+            {"make": "Honda", "n": 4, "latest": 2001, "models": 1},
+            {"make": "Mitsubishi", "n": 1, "latest": 2005, "models": 1},
+            {"make": "Toyota", "n": 2, "latest": 2004, "models": 1},
+        ] == rows
+
+        rows = db.query(Car).filter("year<2000").aggregate(total=sum_("year"))
+        assert [{"total": 1984 + 1995 + 1998 + 1988}] == rows
+
+    def test_13_12_result_cache(self):
+
+        db = Database(self.get_db(), result_cache=ResultCache(ttl=60))
+
+        query = db.query(Car).filter("make==@make", make="Toyota").sort("year").cached()
+        cars = query.all()
+        cars[0].year = 1900
+        assert [1988, 2004] == [c.year for c in query.all()]
+        assert 2 == query.count()
+        assert 1 == db.result_cache.info().hits
+
+        db.query(Car).filter("make==@make", make="Toyota").update(model="COROLLA")
+        assert 0 == db.result_cache.info().currsize
+        assert ["COROLLA"] * 2 == [c.model for c in query.all()]
+
+        db.query(Car).filter("make==@make", make="Toyota").update(model="Corolla")
+        db.update(query.all()[0])
+        assert 0 == db.result_cache.info().currsize
+        assert ["Corolla"] * 2 == [c.model for c in query.all()]
+
+    def test_13_12_01_result_cache_entries(self):
+
+        cache = ResultCache(maxsize=2, ttl=None)
+        cache.put("q1", [1], ["cars"])
+        cache.put("q2", [2], ["cars", "people"])
+        cache.put("q3", [3], ["people"])
+
+        assert cache.get("q1") is None
+        cache.invalidate("people")
+        assert cache.get("q2") is None and cache.get("q3") is None
+
+        # results read before an invalidation are not stored
+        generation = cache.generation(["cars"])
+        cache.invalidate("cars")
+        cache.put("q1", [1], ["cars"], generation=generation)
+        assert cache.get("q1") is None
+
+        cache.put("q1", [1], ["cars"], ttl=-1)
+        assert cache.get("q1") is None
+
+        info = cache.info()
+        self.assertEqual((0, 5, 1, 2, 0, 1, 2), tuple(info))
+
+    def test_13_13_parallel_iter(self):
+
+        db = self._get_db_obj()
+
+        query = db.query(Car).filter("make==@make", make="Honda")
+        cars = list(query.parallel_iter(partitions=3, batch_size=1))
+        assert [1984, 1995, 1998, 2001] == sorted(c.year for c in cars)
+        assert isinstance(cars[0], Car)
+
+        keys = query.parallel_iter(partitions=10, workers=2, transform=lambda d: d["_key"])
+        assert sorted(keys) == sorted(c._key for c in cars)
+
+        with self.assertRaises(ValueError):
+            list(query.sort("year").parallel_iter())
+
+    def test_13_14_filter_expressions(self):
+
+        db = self._get_db_obj()
+
+        query = db.query(Car).filter(
+            (Car.year >= 1990) & Car.make.in_(["Honda", "Toyota"])
+        ).sort("year")
+        assert [1995, 1998, 2001, 2004] == [c.year for c in query.all()]
+
+        query = db.query(Car).filter(Car.model.like("c%", case_insensitive=True) & ~(Car.year < 2000))
+        assert [2001, 2004] == sorted(c.year for c in query.all())
+
+    def test_13_15_joinedload(self):
+
+        db = self._get_db_obj()
+        kashif = Person(_key="kashif", name="Kashif")
+        db.add(kashif)
+
+        cars = db.query(Car).options(joinedload("owner")).sort("year").all()
+        assert ["Kashif"] * 3 + [None] == [c.owner and c.owner.name for c in cars[:4]]
+        assert all("owner" in c._refs_vals for c in cars)
+
+        person = db.query(Person).filter("_key==@key", key="kashif").options(joinedload("cars")).one()
+        assert [1984, 1988, 1995] == sorted(c.year for c in person._refs_vals["cars"])
+        assert 3 == len(person.cars)
+
+        # raw results don't run the joins
+        query = db.query(Car).filter("owner_key==@key", key="kashif").options(joinedload("owner"))
+        assert all(isinstance(row, dict) for row in query.dicts())
+        assert [("Honda",)] == list(query.sort("year").limit(1).tuples("make"))
+
+        db.delete(kashif)
+
+    def test_13_15_01_joinedload_aql(self):
+
+        query = Query(Car).options(joinedload("owner"))
+        aql, bind_vars = query._select_aql(query._load_clause())
+        assert "LET rec_join_0 = (FOR ref IN @@_join0 FILTER ref._key == rec.owner_key LIMIT 1 RETURN ref)" in aql
+        assert aql.endswith("RETURN [rec, rec_join_0[0]]")
+        assert "persons" == bind_vars["@_join0"]
+        assert "@_join0" not in query._bind_vars
+
+        # limited queries bind the limit too
+        db = mock.Mock()
+        db.aql.execute.return_value = []
+        Query(Car, db).options(joinedload("owner")).limit(5).all()
+        self.assertEqual(
+            {"@collection": "cars", "@_join0": "persons", "_limit_offset": 0, "_limit_count": 5},
+            db.aql.execute.call_args[1]["bind_vars"],
+        )
+
+        # cached results are invalidated by writes to the joined collections
+        db.result_cache = ResultCache()
+        db.aql.execute.return_value = mock.MagicMock()
+        query = Query(Car, db).options(joinedload("owner")).cached()
+        query.all()
+        query.all()
+        assert 1 == db.result_cache.info().misses
+        db.result_cache.invalidate("persons")
+        query.all()
+        assert 2 == db.result_cache.info().misses
+
+        car = query._load_record([
+            {"_key": "1", "make": "Honda", "model": "Civic", "year": 1984, "owner_key": "p1"},
+            {"_key": "p1", "name": "Kashif"},
+        ])
+        assert "Kashif" == car.owner.name
+
+        with self.assertRaises(ValueError):
+            Query(Car).options(joinedload("make"))
+
     def test_14_update_filtered_records(self):
 
         db = self._get_db_obj()
@@ -241,6 +562,21 @@ class TestQuery(TestBase):
         assert "NEW MAKE" == records[1].make
         assert "Corolla" == records[1].model 
 
+    def test_15_01_update_returning(self):
+
+        db = self._get_db_obj()
+
+        records = db.query(Car).filter("year==2005").update(model='LANCER', returning='new')
+        assert 1 == len(records)
+        assert isinstance(records[0], Car)
+        assert "LANCER" == records[0].model
+        assert "NEW MAKE" == records[0].make
+
+        old = db.query(Car).filter("year==2005").returns('model').update(model='Lancer', returning='old')
+        assert "LANCER" == old[0].model
+
+        assert 4 == db.query(Car).filter("make=='HONDA'").update(make='HONDA', returning='count')
+
     def test_16_update_all_records(self):
 
         db = self._get_db_obj()
@@ -259,6 +595,18 @@ class TestQuery(TestBase):
 
         assert 5 == db.query(Car).count()
 
+    def test_17_01_delete_returning(self):
+
+        db = self._get_db_obj()
+
+        removed = db.query(Car).limit(1).delete(returning='old')
+        assert 1 == len(removed)
+        assert isinstance(removed[0], Car)
+        assert 4 == db.query(Car).count()
+
+        assert 1 == db.query(Car).limit(1).delete(returning='count')
+        assert 3 == db.query(Car).count()
+
     def test_18_delete_all_records(self):
 
         db = self._get_db_obj()